@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+from django.views.decorators.vary import vary_on_cookie
+
+from core.conditional import conditional
+from core.replicas import replica_read
+from posts import freshness
+from posts.feed import get_feed
+from posts.models import Group, Post, User
+from posts.threads import get_comments_page
+from posts.utils import CursorPaginator
+
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date,
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'image': lambda post: post.image.url if post.image else None,
+}
+
+POST_DETAIL_FIELDS = {
+    **POST_FIELDS,
+    'comments_count': lambda post: post.comments_count,
+}
+
+COMMENT_FIELDS = {
+    'id': lambda comment: comment.pk,
+    'author': lambda comment: comment.author.username,
+    'text': lambda comment: comment.text,
+    'pub_date': lambda comment: comment.pub_date,
+    'parent': lambda comment: comment.parent_id,
+    'depth': lambda comment: comment.depth,
+}
+
+
+class FieldsError(ValueError):
+    """В ?fields= запрошено поле, которого нет в ответе."""
+
+
+def select_fields(request, available):
+    """Поля из ?fields=id,text (по умолчанию все) в порядке запроса."""
+    requested = request.GET.get('fields')
+    if not requested:
+        return available
+    names = [name for name in requested.split(',') if name]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise FieldsError(f'Неизвестные поля: {", ".join(unknown)}')
+    return {name: available[name] for name in names}
+
+
+def serialize(obj, fields):
+    return {name: getter(obj) for name, getter in fields.items()}
+
+
+def serialize_page(page, fields):
+    return {
+        'results': [serialize(obj, fields) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def listing(request, posts):
+    """Страница постов по курсору с выбранными полями."""
+    try:
+        fields = select_fields(request, POST_FIELDS)
+    except FieldsError as error:
+        return json_response({'error': str(error)}, status=400)
+    page = CursorPaginator(posts, settings.NUM_REC).get_page(
+        request.GET.get('cursor')
+    )
+    return json_response(serialize_page(page, fields))
+
+
+@require_safe
+@replica_read
+@conditional(freshness.index)
+def posts(request):
+    return listing(request, Post.objects.for_feed())
+
+
+@require_safe
+@replica_read
+@conditional(freshness.group)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return listing(request, group.posts.for_feed())
+
+
+@require_safe
+@replica_read
+@conditional(freshness.profile)
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return listing(request, author.posts.for_feed())
+
+
+@require_safe
+@vary_on_cookie
+@replica_read
+@conditional(freshness.follow)
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        return json_response({'error': 'Требуется вход'}, status=401)
+    return listing(request, get_feed(request.user))
+
+
+@require_safe
+@replica_read
+@conditional(freshness.post)
+def post_detail(request, post_id):
+    """Пост и порция комментариев (?cursor=, ?thread= как на странице)."""
+    try:
+        fields = select_fields(request, POST_DETAIL_FIELDS)
+    except FieldsError as error:
+        return json_response({'error': str(error)}, status=400)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
+    comments, _ = get_comments_page(post.pk, request)
+    return json_response({
+        'post': serialize(post, fields),
+        'comments': serialize_page(comments, COMMENT_FIELDS),
+    })
@@ -0,0 +1,136 @@
+import pickle
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .resp import RespClient
+
+# INCRBY только для существующего ключа — одним атомарным вызовом:
+# отдельный EXISTS оставлял окно, в котором истёкший ключ
+# воскресал бы со значением delta.
+INCR_EXISTING = (
+    "if redis.call('EXISTS', KEYS[1]) == 1 then "
+    "return redis.call('INCRBY', KEYS[1], ARGV[1]) end"
+)
+
+
+class RedisCache(BaseCache):
+    """Кэш на сервере с протоколом Redis, общий для всех процессов.
+
+    Целые числа хранятся строкой, чтобы incr выполнялся на сервере
+    атомарно, остальные значения сериализуются pickle.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._client = RespClient(
+            server or 'redis://127.0.0.1:6379/0',
+            timeout=options.get('SOCKET_TIMEOUT', 1.0),
+        )
+
+    def _key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _ttl(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return max(int(timeout * 1000), 0)
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(raw):
+        if raw is None:
+            return None
+        try:
+            return int(raw)
+        except ValueError:
+            return pickle.loads(raw)
+
+    def _set_command(self, key, value, timeout, *flags):
+        command = ['SET', key, self._dump(value)]
+        ttl = self._ttl(timeout)
+        if ttl is not None:
+            command += ['PX', ttl]
+        return command + list(flags)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self._ttl(timeout) == 0:
+            return False
+        key = self._key(key, version)
+        reply = self._client.execute(
+            *self._set_command(key, value, timeout, 'NX')
+        )
+        return reply is not None
+
+    def get(self, key, default=None, version=None):
+        raw = self._client.execute('GET', self._key(key, version))
+        return default if raw is None else self._load(raw)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if self._ttl(timeout) == 0:
+            self._client.execute('DEL', key)
+            return
+        self._client.execute(*self._set_command(key, value, timeout))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        ttl = self._ttl(timeout)
+        if ttl is None:
+            exists, _ = self._client.pipeline([
+                ('EXISTS', key), ('PERSIST', key),
+            ])
+            return bool(exists)
+        return bool(self._client.execute('PEXPIRE', key, ttl))
+
+    def delete(self, key, version=None):
+        self._client.execute('DEL', self._key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = [self._key(key, version) for key in keys]
+        values = self._client.execute('MGET', *made)
+        return {
+            key: self._load(raw)
+            for key, raw in zip(keys, values)
+            if raw is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if self._ttl(timeout) == 0:
+            self.delete_many(data, version)
+            return []
+        self._client.pipeline([
+            self._set_command(self._key(key, version), value, timeout)
+            for key, value in data.items()
+        ])
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._client.execute('DEL', *keys)
+
+    def has_key(self, key, version=None):
+        return bool(self._client.execute('EXISTS', self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        value = self._client.execute('EVAL', INCR_EXISTING, 1, key, delta)
+        if value is None:
+            raise ValueError(f"Key '{key}' not found")
+        return value
+
+    def clear(self):
+        self._client.execute('FLUSHDB')
@@ -0,0 +1,50 @@
+import re
+
+from django.core.cache.utils import make_template_fragment_key
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from core.context_processors.cache import cache_timeout
+
+from .stampede import fetch, fragment_cache
+
+HOLE = '<!--hole:{}-->'
+HOLE_PATTERN = re.compile(r'<!--hole:([\w./-]+)-->')
+
+
+def fill_holes(request, shell):
+    return HOLE_PATTERN.sub(
+        lambda match: render_to_string(match.group(1), request=request),
+        shell,
+    )
+
+
+def shared_page(request, version, template_name, get_context):
+    """Страница из общего кэша по версии, пути и параметрам запроса.
+
+    get_context() вызывается только при промахе: запросы ленты
+    не выполняются, пока страница в кэше. Общая страница хранится
+    с метками {% hole %}: вошедшему пользователю заполняются только
+    они, анонимам страница кэшируется уже заполненной.
+    """
+    cache = fragment_cache()
+    key = make_template_fragment_key(
+        f'page:{template_name}', [version, request.get_full_path()]
+    )
+    timeout = cache_timeout(request)['cache_timeout']
+    shell = fetch(
+        cache, key,
+        lambda: render_to_string(
+            template_name, {**get_context(), 'punch_holes': True}, request
+        ),
+        timeout,
+    )
+    if request.user.is_authenticated:
+        content = fill_holes(request, shell)
+    else:
+        content = fetch(
+            cache, f'{key}:anonymous',
+            lambda: fill_holes(request, shell),
+            timeout,
+        )
+    return HttpResponse(content)
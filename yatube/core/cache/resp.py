@@ -0,0 +1,107 @@
+import socket
+import threading
+from urllib.parse import urlparse
+
+
+class RespError(Exception):
+    """Ошибка, которую вернул сервер."""
+
+
+def encode(*args):
+    """Кодирует команду массивом bulk-строк RESP."""
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif isinstance(arg, int):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def read_reply(stream):
+    """Читает один ответ RESP из файлового объекта."""
+    line = stream.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError('Соединение с сервером кэша закрыто')
+    kind, rest = line[:1], line[1:-2]
+    if kind == b'+':
+        return rest.decode()
+    if kind == b'-':
+        return RespError(rest.decode())
+    if kind == b':':
+        return int(rest)
+    if kind == b'$':
+        size = int(rest)
+        if size < 0:
+            return None
+        data = stream.read(size + 2)
+        if len(data) != size + 2:
+            raise ConnectionError('Соединение с сервером кэша закрыто')
+        return data[:-2]
+    if kind == b'*':
+        size = int(rest)
+        if size < 0:
+            return None
+        return [read_reply(stream) for _ in range(size)]
+    raise RespError(f'Неизвестный ответ сервера: {line!r}')
+
+
+class RespClient:
+    """Минимальный клиент протокола Redis: по соединению на поток."""
+
+    def __init__(self, url, timeout=1.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.strip('/') or 0)
+        self.password = parsed.password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection(
+            (self.host, self.port), timeout=self.timeout
+        )
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        stream = sock.makefile('rb')
+        self._local.sock, self._local.stream = sock, stream
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        if setup:
+            self._send(setup)
+
+    def close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            self._local.stream.close()
+            sock.close()
+            self._local.sock = self._local.stream = None
+
+    def _send(self, commands):
+        self._local.sock.sendall(b''.join(encode(*args) for args in commands))
+        replies = [read_reply(self._local.stream) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def pipeline(self, commands):
+        """Отправляет команды одним пакетом и возвращает все ответы."""
+        if not commands:
+            return []
+        for attempt in range(2):
+            if getattr(self._local, 'sock', None) is None:
+                self._connect()
+            try:
+                return self._send(commands)
+            except (ConnectionError, socket.timeout, OSError):
+                self.close()
+                if attempt:
+                    raise
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
@@ -0,0 +1,172 @@
+import socketserver
+import threading
+import time
+
+from .backends import INCR_EXISTING
+from .resp import RespError, read_reply
+
+
+def _reply(value):
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, RespError):
+        return b'-%s\r\n' % str(value).encode()
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, str):
+        return b'+%s\r\n' % value.encode()
+    if isinstance(value, list):
+        return b'*%d\r\n' % len(value) + b''.join(map(_reply, value))
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+class Store:
+    """Словарь с временем жизни ключей и подмножеством команд Redis."""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.lock = threading.Lock()
+
+    def _alive(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def _expire(self, key, ms):
+        if ms is None:
+            self.expires.pop(key, None)
+        else:
+            self.expires[key] = time.monotonic() + ms / 1000
+
+    def execute(self, name, *args):
+        handler = getattr(self, f'cmd_{name.decode().lower()}', None)
+        if handler is None:
+            return RespError(f'ERR unknown command {name.decode()!r}')
+        with self.lock:
+            try:
+                return handler(*args)
+            except (TypeError, ValueError):
+                return RespError('ERR syntax error')
+
+    def cmd_ping(self):
+        return 'PONG'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_get(self, key):
+        return self.data[key] if self._alive(key) else None
+
+    def cmd_mget(self, *keys):
+        return [self.cmd_get(key) for key in keys]
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        ttl = None
+        if b'PX' in options:
+            ttl = int(options[options.index(b'PX') + 1])
+        elif b'EX' in options:
+            ttl = int(options[options.index(b'EX') + 1]) * 1000
+        exists = self._alive(key)
+        if b'NX' in options and exists or b'XX' in options and not exists:
+            return None
+        self.data[key] = value
+        self._expire(key, ttl)
+        return 'OK'
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            removed += self._alive(key)
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return removed
+
+    def cmd_exists(self, *keys):
+        return sum(self._alive(key) for key in keys)
+
+    def cmd_incrby(self, key, delta):
+        value = int(self.data[key]) if self._alive(key) else 0
+        value += int(delta)
+        self.data[key] = str(value).encode()
+        return value
+
+    def cmd_eval(self, script, numkeys, *args):
+        """Только скрипты RedisCache: Lua здесь заменён их аналогами."""
+        handler = self.scripts.get(script)
+        if handler is None:
+            return RespError('NOSCRIPT script is not supported')
+        numkeys = int(numkeys)
+        return handler(self, args[:numkeys], args[numkeys:])
+
+    def _incr_existing(self, keys, argv):
+        if not self._alive(keys[0]):
+            return None
+        return self.cmd_incrby(keys[0], argv[0])
+
+    scripts = {INCR_EXISTING.encode(): _incr_existing}
+
+    def cmd_pexpire(self, key, ms):
+        if not self._alive(key):
+            return 0
+        self._expire(key, int(ms))
+        return 1
+
+    def cmd_persist(self, key):
+        if not self._alive(key) or key not in self.expires:
+            return 0
+        self._expire(key, None)
+        return 1
+
+    def cmd_flushdb(self):
+        self.data.clear()
+        self.expires.clear()
+        return 'OK'
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            self.wfile.write(_reply(self.server.store.execute(*command)))
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    """Сервер-заглушка Redis в текущем процессе для тестов и разработки.
+
+    Пример::
+
+        server = RespServer().start()
+        location = server.url
+        ...
+        server.stop()
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), _Handler)
+        self.store = Store()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
@@ -0,0 +1,59 @@
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+
+
+def fragment_cache():
+    """Кэш для фрагментов и страниц: отдельный, если он настроен."""
+    try:
+        return caches['template_fragments']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def _wait(cache, key):
+    deadline = time.monotonic() + settings.FRAGMENT_CACHE_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def fetch(cache, key, compute, timeout):
+    """Значение из кэша с защитой от одновременного пересчёта.
+
+    Вместе со значением хранится время его вычисления; ближе к концу
+    срока запись с растущей вероятностью считается устаревшей (XFetch),
+    и пересчитывает её только процесс, взявший блокировку через add().
+    Остальные до этого отдают старое значение, а при пустом кэше ждут.
+    """
+    lock = f'{key}:lock'
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expiry = entry
+        early = delta * settings.FRAGMENT_CACHE_BETA * -math.log(
+            1 - random.random()
+        )
+        if expiry is None or time.time() + early < expiry:
+            return value
+        if not cache.add(lock, 1, settings.FRAGMENT_CACHE_LOCK_TIMEOUT):
+            return value
+    elif not cache.add(lock, 1, settings.FRAGMENT_CACHE_LOCK_TIMEOUT):
+        entry = _wait(cache, key)
+        if entry is not None:
+            return entry[0]
+        return compute()
+    try:
+        started = time.time()
+        value = compute()
+        finished = time.time()
+        expiry = None if timeout is None else finished + timeout
+        cache.set(key, (value, finished - started, expiry), timeout)
+    finally:
+        cache.delete(lock)
+    return value
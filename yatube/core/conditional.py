@@ -0,0 +1,102 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.middleware.csrf import get_token
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers, quote_etag)
+from django.views.decorators.http import condition
+
+from core.replicas import on_replica
+
+
+def conditional(scope):
+    """condition() по версии кэша области, из которой строится ответ.
+
+    scope(request, **kwargs) возвращает версию области. ETag — хэш
+    версии и полного пути (курсор и поля меняют тело ответа). Если
+    области нет (None), представление выполняется как обычно и само
+    отвечает 404. Last-Modified не отдаётся: правка и удаление поста
+    меняют версию, но не самую свежую дату публикации, и клиент
+    с одним If-Modified-Since получал бы 304 на устаревшие данные.
+
+    Ответ с отстающей реплики может не соответствовать версии,
+    которую уже увеличил default: такой ответ уходит без валидаторов
+    и с no-store, чтобы его не перепроверяли до следующей версии.
+    """
+    def etag(request, **kwargs):
+        if on_replica():
+            return None
+        version = scope(request, **kwargs)
+        if version is None:
+            return None
+        return _hash(version, request.get_full_path())
+
+    def decorator(view):
+        return _no_store_on_replica(condition(etag_func=etag)(view))
+
+    return decorator
+
+
+def _no_store_on_replica(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if on_replica():
+            patch_cache_control(response, no_store=True)
+        return response
+    return wrapper
+
+
+def _hash(*parts):
+    return hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def not_modified(request, version):
+    """Ответ 304, если у браузера свежая копия HTML-страницы, иначе None.
+
+    Вызывается, как только известна версия кэша страницы, — до
+    запросов самой ленты. Страница вошедшего пользователя зависит
+    от него и содержит его CSRF-токен, поэтому они входят в ETag.
+    """
+    if on_replica():
+        # Страница строится по реплике, которая может отставать
+        # от версии: ETag по версии закрепил бы устаревшую копию.
+        request.page_no_store = True
+        return None
+    parts = [version, request.get_full_path()]
+    if request.user.is_authenticated:
+        # get_token заводит токен сразу: иначе первая копия страницы
+        # получила бы ETag без него и не совпала со следующей.
+        get_token(request)
+        parts += [request.user.pk, request.META['CSRF_COOKIE']]
+    request.page_etag = quote_etag(_hash(*parts))
+    return get_conditional_response(request, etag=request.page_etag)
+
+
+def page_cache_policy(view):
+    """ETag и Cache-Control для HTML-страниц.
+
+    Анонимные страницы общие: их держит обратный прокси
+    (s-maxage=PAGE_PROXY_MAX_AGE), браузер перепроверяет по ETag.
+    Страницы вошедших пользователей — только в их браузере
+    и всегда с перепроверкой. Vary: Cookie разделяет эти случаи.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        etag = getattr(request, 'page_etag', None)
+        if etag is not None and not response.has_header('ETag'):
+            response['ETag'] = etag
+        if getattr(request, 'page_no_store', False):
+            patch_cache_control(response, no_store=True)
+        elif request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(
+                response, public=True, max_age=0,
+                s_maxage=settings.PAGE_PROXY_MAX_AGE,
+            )
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
@@ -0,0 +1,13 @@
+from django.conf import settings
+
+from core.replicas import on_replica
+
+
+def cache_timeout(request):
+    # Реплика может отставать от уже сброшенной версии кэша:
+    # собранный по ней фрагмент держим не дольше окна отставания.
+    if on_replica():
+        return {'cache_timeout': settings.REPLICA_STICKY_SECONDS}
+    return {
+        'cache_timeout': settings.PAGE_CACHE_TIMEOUT,
+    }
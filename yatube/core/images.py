@@ -0,0 +1,82 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+from .uploadhandlers import RejectedUpload
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+
+
+def _source(upload):
+    if hasattr(upload, 'temporary_file_path'):
+        return upload.temporary_file_path()
+    upload.seek(0)
+    return upload
+
+
+def inspect_image(upload):
+    """Проверяет загрузку по заголовку, не декодируя пиксели.
+
+    Возвращает (формат, (ширина, высота)) или бросает ValidationError.
+    """
+    if isinstance(upload, RejectedUpload):
+        raise ValidationError(
+            'Файл больше %(limit)s.',
+            code='file_too_large',
+            params={'limit': filesizeformat(upload.limit)},
+        )
+    try:
+        with Image.open(_source(upload)) as image:
+            image_format, size = image.format, image.size
+    except Exception as exc:
+        raise ValidationError(
+            'Загрузите правильное изображение.', code='invalid_image'
+        ) from exc
+    finally:
+        upload.seek(0)
+    if image_format not in ALLOWED_FORMATS:
+        raise ValidationError(
+            'Формат %(format)s не поддерживается.',
+            code='invalid_format',
+            params={'format': image_format},
+        )
+    if size[0] * size[1] > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Изображение больше %(pixels)d мегапикселей.',
+            code='too_many_pixels',
+            params={'pixels': settings.IMAGE_MAX_PIXELS // 10 ** 6},
+        )
+    return image_format, size
+
+
+def downscale(upload, image_format, size):
+    """Уменьшает изображение до IMAGE_MAX_SIDE по большей стороне.
+
+    JPEG декодируется сразу в уменьшенном масштабе (draft), поэтому
+    в памяти не оказывается полноразмерный растр.
+    """
+    limit = settings.IMAGE_MAX_SIDE
+    if max(size) <= limit:
+        return upload
+    ratio = limit / max(size)
+    target = (max(1, round(size[0] * ratio)), max(1, round(size[1] * ratio)))
+    with Image.open(_source(upload)) as image:
+        if image_format == 'JPEG':
+            image.draft('RGB', target)
+        image.thumbnail(target, Image.LANCZOS)
+        options = {'quality': 90} if image_format in ('JPEG', 'WEBP') else {}
+        buffer = BytesIO()
+        image.save(buffer, image_format, **options)
+    return InMemoryUploadedFile(
+        buffer,
+        'image',
+        os.path.basename(upload.name),
+        Image.MIME.get(image_format),
+        buffer.tell(),
+        None,
+    )
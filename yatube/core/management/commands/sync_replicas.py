@@ -0,0 +1,46 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует базу default в SQLite-реплики через backup API: '
+        'замена репликации для локальной проверки чтения с реплик'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять каждые N секунд (0 — один раз)',
+        )
+
+    def sync(self, source, replicas):
+        started = time.monotonic()
+        # Как и Django, имя базы может быть URI (file:...?mode=memory).
+        with closing(sqlite3.connect(source, uri=True)) as primary:
+            for name in replicas:
+                with closing(sqlite3.connect(name, timeout=30)) as replica:
+                    primary.backup(replica)
+        return time.monotonic() - started
+
+    def handle(self, *args, **options):
+        databases = settings.DATABASES
+        if databases['default']['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Поддерживается только SQLite')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не заданы: YATUBE_REPLICAS')
+        replicas = [
+            databases[alias]['NAME'] for alias in settings.DATABASE_REPLICAS
+        ]
+        while True:
+            elapsed = self.sync(databases['default']['NAME'], replicas)
+            self.stdout.write(
+                f'Реплик обновлено: {len(replicas)} за {elapsed:.2f} с'
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
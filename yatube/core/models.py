@@ -10,3 +10,26 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class CountersModel(models.Model):
+    """Абстрактная модель. Не перезаписывает счётчики при сохранении.
+
+    Счётчики меняются только F-выражениями, поэтому полное сохранение
+    загруженного ранее объекта не должно затирать их старыми значениями.
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and self.pk is not None
+                and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
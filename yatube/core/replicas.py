@@ -0,0 +1,96 @@
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+COOKIE_NAME = 'db_primary'
+
+_state = threading.local()
+
+
+def on_replica():
+    """Идёт ли сейчас чтение с реплик (внутри @replica_read)."""
+    return bool(
+        getattr(_state, 'replica', False) and settings.DATABASE_REPLICAS
+    )
+
+
+@contextmanager
+def use_replica():
+    previous = getattr(_state, 'replica', False)
+    _state.replica = True
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+class ReplicaRouter:
+    """Чтение в @replica_read-представлениях — с реплик, запись — в default.
+
+    Сессии всегда читаются из default: вход на сайт должен быть
+    виден сразу. Реплики — копии default (их наполняет репликатор),
+    поэтому миграции на них не применяются.
+    """
+
+    def db_for_read(self, model, **hints):
+        if on_replica() and model._meta.app_label != 'sessions':
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def wrote_recently(request):
+    return COOKIE_NAME in request.COOKIES
+
+
+def replica_read(view):
+    """Читает данные представления с реплики.
+
+    Сразу после собственной записи (окно REPLICA_STICKY_SECONDS)
+    браузер читает из default, чтобы увидеть свои изменения,
+    которые ещё не дошли до реплик.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if wrote_recently(request):
+            return view(request, *args, **kwargs)
+        with use_replica():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class StickyPrimaryMiddleware:
+    """Ставит куки на окно REPLICA_STICKY_SECONDS после записи в базу.
+
+    Окно хранится в самом браузере, а не в сессии: отметка не стоит
+    лишних запросов к базе и истекает вместе с куки.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.wrote = False
+        response = self.get_response(request)
+        if _state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                COOKIE_NAME, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
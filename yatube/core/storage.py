@@ -0,0 +1,41 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """Файлы называются по sha256 содержимого: одинаковые загрузки
+    хранятся один раз, повторная запись и новые миниатюры не нужны.
+
+    Файл могут разделять несколько записей, поэтому при удалении записи
+    он остаётся на диске; сиротские файлы убирает команда gc_media.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            os.path.dirname(name), hexdigest[:2], hexdigest + extension
+        ).replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Свежий mtime не даёт gc_media принять файл за старого сироту,
+            # пока пост с повторной загрузкой ещё не сохранён.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
@@ -0,0 +1,79 @@
+from django import template
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode
+
+from core.cache.page import HOLE
+from core.cache.stampede import fetch, fragment_cache
+
+register = template.Library()
+
+
+class GuardedCacheNode(CacheNode):
+    def get_cache(self, context):
+        if self.cache_name:
+            return caches[self.cache_name.resolve(context)]
+        return fragment_cache()
+
+    def render(self, context):
+        expire_time = self.expire_time_var.resolve(context)
+        if expire_time is not None:
+            expire_time = int(expire_time)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return fetch(
+            self.get_cache(context),
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time,
+        )
+
+
+@register.tag
+def guarded_cache(parser, token):
+    """Как {% cache %}, но с защитой от лавины пересчётов фрагмента.
+
+    {% guarded_cache timeout name [var ...] [using="cache"] %}
+    """
+    nodelist = parser.parse(('endguarded_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires at least 2 arguments.'
+        )
+    cache_name = None
+    if len(tokens) > 3 and tokens[-1].startswith('using='):
+        cache_name = parser.compile_filter(tokens.pop()[len('using='):])
+    return GuardedCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(bit) for bit in tokens[3:]],
+        cache_name,
+    )
+
+
+class HoleNode(template.Node):
+    def __init__(self, template_name):
+        self.template_name = template_name
+
+    def render(self, context):
+        name = self.template_name.resolve(context)
+        if context.get('punch_holes'):
+            return HOLE.format(name)
+        return context.template.engine.get_template(name).render(context)
+
+
+@register.tag
+def hole(parser, token):
+    """Пользовательская часть страницы из общего кэша (см. shared_page).
+
+    {% hole "template" %} — как {% include %}; в кэшируемой странице
+    вместо неё остаётся метка, которую заполняют на каждый запрос.
+    """
+    tokens = token.split_contents()
+    if len(tokens) != 2:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires a template name.'
+        )
+    return HoleNode(parser.compile_filter(tokens[1]))
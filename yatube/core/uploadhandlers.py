@@ -0,0 +1,45 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class RejectedUpload(UploadedFile):
+    """Файл, отброшенный при загрузке: содержимое не сохранялось."""
+
+    def __init__(self, name, content_type, size, limit):
+        super().__init__(BytesIO(), name, content_type, size)
+        self.limit = limit
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    """Ограничивает размер файла, пока тот ещё передаётся.
+
+    Стоит первым в FILE_UPLOAD_HANDLERS: после превышения лимита
+    следующие обработчики не получают ни одного байта файла, а вместо
+    него в request.FILES попадает RejectedUpload, который форма
+    превращает в ошибку.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.limit = settings.UPLOAD_MAX_SIZE
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.rejected = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.limit:
+            self.rejected = True
+        return None if self.rejected else raw_data
+
+    def file_complete(self, file_size):
+        if not self.rejected:
+            return None
+        return RejectedUpload(
+            self.file_name, self.content_type, self.received, self.limit
+        )
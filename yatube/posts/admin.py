@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import fulltext
 from .models import Comment, Follow, Group, Post
 
 
@@ -17,6 +18,14 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по поисковому индексу вместо LIKE по тексту."""
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(
+            pk__in=fulltext.matching_ids(search_term)
+        ), False
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
@@ -40,6 +49,13 @@ class CommentAdmin(admin.ModelAdmin):
     )
     list_filter = ('text', 'pub_date')
     search_fields = ('post', 'author', 'text')
+    raw_id_fields = ('parent',)
+
+    def get_readonly_fields(self, request, obj=None):
+        # Путь ветки вычисляется при создании, перенос ответа его сломал бы.
+        if obj is not None:
+            return ('parent',)
+        return ()
 
 
 @admin.register(Follow)
@@ -0,0 +1,43 @@
+import time
+
+from django.core.cache import cache
+
+INDEX = ('index', 'all')
+
+
+def _key(scope, pk):
+    return f'posts:version:{scope}:{pk}'
+
+
+def _initial():
+    # Версия от времени не совпадёт с прежней, даже если ключ вытеснили.
+    return int(time.time() * 1000)
+
+
+def get_version(*scopes):
+    """Версия кэша для набора областей вида (scope, pk)."""
+    keys = [_key(*scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial(), None)
+            versions[key] = cache.get(key, _initial())
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def bump(*scopes):
+    """Сбрасывает кэш фрагментов, зависящих от указанных областей."""
+    for scope in set(scopes):
+        key = _key(*scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial(), None)
+
+
+def post_scopes(post, *group_ids):
+    scopes = [INDEX, ('author', post.author_id), ('post', post.pk)]
+    for group_id in {post.group_id, *group_ids}:
+        if group_id is not None:
+            scopes.append(('group', group_id))
+    return scopes
@@ -0,0 +1,72 @@
+from itertools import islice
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, User, UserCounter
+
+
+def change(queryset, field, delta):
+    """Атомарно сдвигает счётчик: UPDATE ... SET field = field + delta."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_user(user_id, field, delta):
+    counters = UserCounter.objects.filter(user_id=user_id)
+    if not change(counters, field, delta) and delta > 0:
+        UserCounter.objects.get_or_create(user_id=user_id)
+        change(counters, field, delta)
+
+
+def get_count(user_id, field):
+    return UserCounter.objects.filter(
+        user_id=user_id
+    ).values_list(field, flat=True).first() or 0
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def _repair(queryset, field, actual):
+    return queryset.exclude(**{field: actual}).update(**{field: actual})
+
+
+def reconcile():
+    """Пересчитывает все счётчики и возвращает число исправленных строк."""
+    missing = User.objects.filter(counters__isnull=True).values_list(
+        'pk', flat=True
+    )
+    missing = missing.iterator()
+    while True:
+        batch = [UserCounter(user_id=pk) for pk in islice(missing, 1000)]
+        if not batch:
+            break
+        UserCounter.objects.bulk_create(batch, ignore_conflicts=True)
+    users = UserCounter.objects.all()
+    return {
+        'posts.comments_count': _repair(
+            Post.objects.all(), 'comments_count',
+            _count(Comment.objects.all(), 'post'),
+        ),
+        'groups.posts_count': _repair(
+            Group.objects.all(), 'posts_count',
+            _count(Post.objects.all(), 'group'),
+        ),
+        'users.posts_count': _repair(
+            users, 'posts_count', _count(Post.objects.all(), 'author'),
+        ),
+        'users.followers_count': _repair(
+            users, 'followers_count', _count(Follow.objects.all(), 'author'),
+        ),
+    }
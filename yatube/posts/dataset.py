@@ -0,0 +1,222 @@
+import datetime
+import gzip
+import json
+import os
+from itertools import islice
+
+from django.db import models, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from . import counters, feed
+from .cache import INDEX, bump
+from .models import (COMMENT_PATH_WIDTH, Comment, Follow, Group, Post, User,
+                     comment_path)
+from .seeding import explicit_dates, next_pk, reset_sequences
+
+MODELS = (
+    ('users', User, (
+        'id', 'username', 'password', 'email', 'first_name', 'last_name',
+        'is_active', 'is_staff', 'is_superuser', 'date_joined', 'last_login',
+    )),
+    ('groups', Group, ('id', 'title', 'slug', 'description')),
+    ('posts', Post, ('id', 'text', 'pub_date', 'author', 'group', 'image')),
+    ('comments', Comment, (
+        'id', 'post', 'author', 'parent', 'text', 'pub_date', 'path', 'depth',
+    )),
+    ('follows', Follow, ('user', 'author')),
+)
+
+
+class DatasetError(ValueError):
+    """Файл выгрузки не согласован: ссылка на отсутствующую запись."""
+
+
+def _default(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, f'{mode}t', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def export(directory, compress=False, chunk_size=2000):
+    """Выгружает модели в <directory>/<name>.jsonl[.gz] построчно.
+
+    Генератор: после каждого файла отдаёт (имя, число записей).
+    Записи читаются потоком через iterator(), в памяти только пачка.
+    """
+    os.makedirs(directory, exist_ok=True)
+    suffix = '.jsonl.gz' if compress else '.jsonl'
+    for name, model, fields in MODELS:
+        count = 0
+        rows = model.objects.order_by('pk').values(*fields)
+        with _open(os.path.join(directory, name + suffix), 'w') as out:
+            for row in rows.iterator(chunk_size=chunk_size):
+                out.write(json.dumps(
+                    row, ensure_ascii=False, default=_default
+                ) + '\n')
+                count += 1
+        yield name, count
+
+
+class Importer:
+    """Загружает выгрузку export() пачками bulk_create.
+
+    Пользователи сопоставляются по username, группы — по slug:
+    совпавшие записи не создаются, ссылки переводятся на них.
+    Посты получают pk со сдвигом на текущий максимум (в пустой базе
+    pk сохраняются), поэтому комментарии переводятся без таблицы
+    соответствия и память не растёт с числом постов.
+    """
+
+    def __init__(self, directory, batch_size=5000, log=None):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.users = {}
+        self.groups = {}
+
+    def _rows(self, name):
+        for suffix in ('.jsonl', '.jsonl.gz'):
+            path = os.path.join(self.directory, name + suffix)
+            if os.path.exists(path):
+                with _open(path, 'r') as lines:
+                    for line in lines:
+                        if line.strip():
+                            yield json.loads(line)
+                return
+
+    def _batches(self, name):
+        rows = self._rows(name)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def _build(self, model, row, **values):
+        for name, value in row.items():
+            field = model._meta.get_field(name)
+            if isinstance(field, models.DateTimeField) and value:
+                value = parse_datetime(value)
+            values.setdefault(field.attname, value)
+        return model(**values)
+
+    def _ref(self, mapping, name, pk):
+        if pk is None:
+            return None
+        try:
+            return mapping[pk]
+        except KeyError:
+            raise DatasetError(f'{name}: нет записи с pk={pk}')
+
+    def _insert(self, model, objects, **options):
+        model.objects.bulk_create(objects, **options)
+        return len(objects)
+
+    def _match(self, name, model, key, mapping):
+        """Создаёт недостающие записи, сопоставляя существующие по key."""
+        pk = next_pk(model)
+        created = 0
+        with transaction.atomic():
+            for batch in self._batches(name):
+                existing = dict(model.objects.filter(**{
+                    f'{key}__in': [row[key] for row in batch]
+                }).values_list(key, 'pk'))
+                new = []
+                for row in batch:
+                    old_pk = row.pop('id')
+                    if row[key] in existing:
+                        mapping[old_pk] = existing[row[key]]
+                        continue
+                    mapping[old_pk] = pk
+                    new.append(self._build(model, row, id=pk))
+                    pk += 1
+                created += self._insert(model, new)
+        self.log(f'{model.__name__}: {created}')
+
+    def import_posts(self):
+        offset = Post.objects.aggregate(top=Max('pk'))['top'] or 0
+        self.post_offset = offset
+        created = 0
+        with transaction.atomic(), explicit_dates(Post):
+            for batch in self._batches('posts'):
+                created += self._insert(Post, [
+                    self._build(
+                        Post, row,
+                        id=row.pop('id') + offset,
+                        author_id=self._ref(
+                            self.users, 'author', row.pop('author')
+                        ),
+                        group_id=self._ref(
+                            self.groups, 'group', row.pop('group')
+                        ),
+                    )
+                    for row in batch
+                ])
+        self.log(f'Post: {created}')
+
+    def _comment(self, row, offset):
+        parent = row.pop('parent')
+        path = row.pop('path')
+        width = COMMENT_PATH_WIDTH
+        return self._build(
+            Comment, row,
+            id=row.pop('id') + offset,
+            post_id=row.pop('post') + self.post_offset,
+            author_id=self._ref(self.users, 'author', row.pop('author')),
+            parent_id=parent + offset if parent else None,
+            path=''.join(
+                comment_path('', int(path[start:start + width]) + offset)
+                for start in range(0, len(path), width)
+            ),
+        )
+
+    def import_comments(self):
+        """Комментарии сдвигаются по pk как посты, пути веток — следом."""
+        offset = Comment.objects.aggregate(top=Max('pk'))['top'] or 0
+        created = 0
+        with transaction.atomic(), explicit_dates(Comment):
+            for batch in self._batches('comments'):
+                created += self._insert(Comment, [
+                    self._comment(row, offset) for row in batch
+                ])
+        self.log(f'Comment: {created}')
+
+    def import_follows(self):
+        created = 0
+        with transaction.atomic():
+            for batch in self._batches('follows'):
+                created += self._insert(Follow, [
+                    Follow(
+                        user_id=self._ref(self.users, 'user', row['user']),
+                        author_id=self._ref(
+                            self.users, 'author', row['author']
+                        ),
+                    )
+                    for row in batch
+                ], ignore_conflicts=True)
+        self.log(f'Follow: {created}')
+
+    def run(self, rebuild_feed=True):
+        self._match('users', User, 'username', self.users)
+        self._match('groups', Group, 'slug', self.groups)
+        self.import_posts()
+        self.import_comments()
+        self.import_follows()
+        reset_sequences(User, Group, Post, Comment, Follow)
+        counters.reconcile()
+        self.log('Счётчики пересчитаны')
+        if rebuild_feed:
+            feed.rebuild()
+            self.log('Ленты подписок пересобраны')
+        bump(
+            INDEX,
+            *(('author', pk) for pk in set(self.users.values())),
+            *(('group', pk) for pk in set(self.groups.values())),
+        )
@@ -0,0 +1,260 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings as s
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .counters import get_count
+from .models import FEED_FIELDS, FeedEntry, Follow, Post, UserCounter
+
+
+class MergedFeed:
+    """Ленивое k-путевое слияние отсортированных потоков постов.
+
+    Поддерживает то подмножество API QuerySet, которое нужно
+    Paginator и CursorPaginator: count, order_by, filter и срезы.
+    """
+
+    ordered = True
+
+    def __init__(self, streams, ordering=('-pub_date', '-pk')):
+        self.streams = list(streams)
+        self.ordering = tuple(ordering)
+
+    def _key(self, post):
+        return tuple(getattr(post, field.lstrip('-'))
+                     for field in self.ordering)
+
+    def _merge(self, limit=None):
+        streams = [stream.order_by(*self.ordering) for stream in self.streams]
+        if limit is not None:
+            streams = [stream[:limit] for stream in streams]
+        return heapq.merge(
+            *streams,
+            key=self._key,
+            reverse=self.ordering[0].startswith('-'),
+        )
+
+    @property
+    def model(self):
+        return self.streams[0].model
+
+    def order_by(self, *ordering):
+        return MergedFeed(self.streams, ordering)
+
+    def filter(self, *args, **kwargs):
+        return MergedFeed(
+            [stream.filter(*args, **kwargs) for stream in self.streams],
+            self.ordering,
+        )
+
+    def count(self):
+        return sum(stream.count() for stream in self.streams)
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return self._merge()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index.step is not None:
+                raise ValueError('Шаг среза не поддерживается')
+            start = index.start or 0
+            return list(islice(self._merge(index.stop), start, index.stop))
+        return self[index:index + 1][0]
+
+
+class EntryStream:
+    """Посты материализованной ленты, читаемые по индексу FeedEntry.
+
+    Сортировка и фильтры по pub_date/pk переводятся на столбцы
+    FeedEntry, поэтому страница ленты — один диапазон индекса
+    (user, pub_date, post) без сортировки во временном дереве.
+    """
+
+    ordered = True
+    model = Post
+    FIELDS = {'pk': 'post_id', 'id': 'post_id'}
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def _field(self, lookup):
+        name, _, rest = lookup.partition('__')
+        name = self.FIELDS.get(name, name)
+        return f'{name}__{rest}' if rest else name
+
+    def _q(self, q):
+        clone = Q()
+        clone.connector = q.connector
+        clone.negated = q.negated
+        clone.children = [
+            self._q(child) if isinstance(child, Q)
+            else (self._field(child[0]), child[1])
+            for child in q.children
+        ]
+        return clone
+
+    def order_by(self, *ordering):
+        return EntryStream(self.entries.order_by(*(
+            '-' * field.startswith('-') + self._field(field.lstrip('-'))
+            for field in ordering
+        )))
+
+    def filter(self, *args, **kwargs):
+        return EntryStream(self.entries.filter(
+            *(self._q(q) for q in args),
+            **{self._field(key): value for key, value in kwargs.items()},
+        ))
+
+    def exclude(self, *args, **kwargs):
+        return EntryStream(self.entries.exclude(*args, **kwargs))
+
+    def count(self):
+        return self.entries.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return (entry.post for entry in self.entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [entry.post for entry in self.entries[index]]
+        return self.entries[index].post
+
+
+def _bulk_insert(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, s.FEED_BATCH_SIZE))
+        if not batch:
+            return
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def followers_count(author_id):
+    return get_count(author_id, 'followers_count')
+
+
+def is_celebrity(author_id):
+    """Посты автора с множеством подписчиков не раскладываются по лентам."""
+    return followers_count(author_id) >= s.FEED_CELEBRITY_THRESHOLD
+
+
+def fan_out(post):
+    """Добавляет пост в ленты всех подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        FeedEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def _materialize(follows):
+    """Записи лент по подпискам follows одним INSERT ... SELECT.
+
+    Посты знаменитостей в ленты не раскладываются, уже разложенные
+    записи пропускаются. Возвращает число вставленных строк.
+    """
+    celebrities = UserCounter.objects.filter(
+        followers_count__gte=s.FEED_CELEBRITY_THRESHOLD
+    ).values('user_id')
+    rows = follows.exclude(author_id__in=celebrities).filter(
+        author__posts__isnull=False
+    ).values_list(
+        'user_id', 'author__posts__id', 'author_id', 'author__posts__pub_date'
+    )
+    select, params = rows.query.sql_with_params()
+    ops = connection.ops
+    suffix = ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+    columns = ', '.join(
+        ops.quote_name(FeedEntry._meta.get_field(name).column)
+        for name in ('user', 'post', 'author', 'pub_date')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{ops.quote_name(FeedEntry._meta.db_table)} ({columns}) '
+            f'{select}{suffix}',
+            params,
+        )
+        return cursor.rowcount
+
+
+def backfill(user_id, author_id):
+    """Переносит посты автора в ленту нового подписчика."""
+    _materialize(Follow.objects.filter(user_id=user_id, author_id=author_id))
+
+
+def trim(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося читателя.
+
+    Автор, переставший быть знаменитостью, раскладывается по лентам
+    всех подписчиков одним запросом.
+    """
+    # Отписка и так идёт в транзакции delete(): без лишней точки сохранения.
+    with transaction.atomic(savepoint=False):
+        FeedEntry.objects.filter(
+            user_id=user_id, author_id=author_id
+        ).delete()
+        if followers_count(author_id) == s.FEED_CELEBRITY_THRESHOLD - 1:
+            _materialize(Follow.objects.filter(author_id=author_id))
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты указанных пользователей (по умолчанию всех).
+
+    Возвращает число вставленных записей лент.
+    """
+    entries = FeedEntry.objects.all()
+    follows = Follow.objects.all()
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+        follows = follows.filter(user_id__in=user_ids)
+    with transaction.atomic():
+        entries.delete()
+        return _materialize(follows)
+
+
+def get_celebrities(user):
+    """Авторы из подписок пользователя, чьи посты читаются при запросе."""
+    return list(UserCounter.objects.filter(
+        user_id__in=Follow.objects.filter(user=user).values('author_id'),
+        followers_count__gte=s.FEED_CELEBRITY_THRESHOLD,
+    ).values_list('user_id', flat=True))
+
+
+def build_feed(user, celebrities):
+    pushed = EntryStream(
+        FeedEntry.objects.filter(user=user).select_related(
+            'post__author', 'post__group'
+        ).only(
+            'post', *(f'post__{field}' for field in FEED_FIELDS)
+        ).order_by('-pub_date', '-post_id')
+    )
+    if not celebrities:
+        return pushed
+    return MergedFeed(
+        [pushed.exclude(author_id__in=celebrities)]
+        + [Post.objects.for_feed().filter(author_id=pk)
+           for pk in celebrities]
+    )
+
+
+def get_feed(user):
+    """Лента подписок: материализованная часть плюс посты знаменитостей."""
+    return build_feed(user, get_celebrities(user))
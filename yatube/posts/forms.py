@@ -1,5 +1,8 @@
+from django.core.exceptions import ValidationError
 from django.forms import ModelForm
 
+from core.images import downscale, inspect_image
+
 from .models import Comment, Post
 
 
@@ -17,6 +20,28 @@ class PostForm(ModelForm):
             'group': 'Группа, к которой будет относиться пост',
             'image': 'Добавьте изображение'}
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Заголовок проверяется до ImageField.to_python: тот не знает
+        # о лимитах и открыл бы даже отброшенный или огромный файл.
+        self.image_error = self.image_info = None
+        upload = self.files.get('image')
+        if upload is not None:
+            try:
+                self.image_info = inspect_image(upload)
+            except ValidationError as error:
+                self.image_error = error
+                self.files = self.files.copy()
+                del self.files['image']
+
+    def clean_image(self):
+        if self.image_error is not None:
+            raise self.image_error
+        image = self.cleaned_data['image']
+        if self.image_info is not None:
+            image = downscale(image, *self.image_info)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,45 @@
+from .cache import INDEX, get_version
+from .models import Follow, Group, Post, User
+
+
+def index(request):
+    return get_version(INDEX)
+
+
+def group(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return get_version(('group', group_id))
+
+
+def profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return get_version(('author', author_id))
+
+
+def follow(request):
+    """Лента подписок: версии всех авторов и сам набор подписок."""
+    if not request.user.is_authenticated:
+        return None
+    authors = sorted(Follow.objects.filter(
+        user=request.user
+    ).values_list('author_id', flat=True))
+    versions = get_version(*(('author', pk) for pk in authors))
+    return f'{request.user.pk}:{",".join(map(str, authors))}:{versions}'
+
+
+def post(request, post_id):
+    """Пост с комментариями: версия поста растёт и от комментариев."""
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return get_version(('post', post_id), ('author', author_id))
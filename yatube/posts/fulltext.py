@@ -0,0 +1,229 @@
+import re
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.conf import settings as s
+from django.db import connection, transaction
+from django.db.models import Exists, F, OuterRef
+
+from .feed import EntryStream
+from .models import FEED_FIELDS, Comment, Post, SearchPosting
+from .stemmer import stem
+
+TOKEN = re.compile(r'[а-яёa-z0-9]+')
+
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'в', 'во', 'вот', 'все', 'всё', 'вы', 'да', 'для',
+    'до', 'его', 'ее', 'её', 'если', 'есть', 'еще', 'ещё', 'же', 'за',
+    'и', 'из', 'или', 'им', 'их', 'к', 'как', 'ко', 'когда', 'кто', 'ли',
+    'мы', 'на', 'над', 'не', 'нет', 'ни', 'но', 'о', 'об', 'он', 'она',
+    'они', 'оно', 'от', 'по', 'под', 'при', 'с', 'со', 'так', 'также',
+    'то', 'только', 'ты', 'у', 'уже', 'что', 'это', 'я',
+    'a', 'an', 'and', 'in', 'is', 'of', 'on', 'or', 'the', 'to',
+))
+
+
+def analyze(text):
+    """Основы слов текста без стоп-слов: лексемы для индекса и запроса."""
+    return [
+        stem(token)[:64]
+        for token in TOKEN.findall(text.lower())
+        if token not in STOP_WORDS
+    ]
+
+
+def _terms(*texts):
+    terms = Counter()
+    for text in texts:
+        terms.update(analyze(text or ''))
+    return terms
+
+
+def change(post_id, pub_date, old_text, new_text):
+    """Переносит в индекс поста разницу между старым и новым текстом.
+
+    Тексты поста и его комментариев индексируются вместе, вес основы —
+    общее число вхождений. Для нового текста old_text пустой,
+    для удалённого — пустой new_text.
+    """
+    delta = _terms(new_text)
+    delta.subtract(_terms(old_text))
+    by_delta = {}
+    for term, count in delta.items():
+        if count:
+            by_delta.setdefault(count, []).append(term)
+    if not by_delta:
+        return
+    postings = SearchPosting.objects.filter(post_id=post_id)
+    existing = set(postings.filter(
+        term__in=[term for terms in by_delta.values() for term in terms]
+    ).values_list('term', flat=True))
+    for count, terms in by_delta.items():
+        found = [term for term in terms if term in existing]
+        if found:
+            postings.filter(term__in=found).update(
+                weight=F('weight') + count
+            )
+    SearchPosting.objects.bulk_create(
+        SearchPosting(
+            term=term, post_id=post_id, pub_date=pub_date, weight=count
+        )
+        for count, terms in by_delta.items() if count > 0
+        for term in terms if term not in existing
+    )
+    if any(count < 0 for count in by_delta):
+        postings.filter(weight__lte=0).delete()
+
+
+def _documents(posts, **lookup):
+    """(pk, pub_date, тексты) постов; комментарии — одним запросом."""
+    comments = {}
+    for post_id, text in Comment.objects.filter(**lookup).values_list(
+        'post_id', 'text'
+    ):
+        comments.setdefault(post_id, []).append(text)
+    adapt = connection.ops.adapt_datetimefield_value
+    return [
+        (
+            post.pk,
+            adapt(post.pub_date),
+            [post.text, *comments.get(post.pk, ())],
+        )
+        for post in posts
+    ]
+
+
+def _rows(documents):
+    """Строки индекса для документов; не обращается к БД."""
+    return [
+        (term, post_id, pub_date, count)
+        for post_id, pub_date, texts in documents
+        for term, count in _terms(*texts).items()
+    ]
+
+
+def _insert(rows):
+    """Вставляет строки индекса одним executemany.
+
+    bulk_create готовит каждое значение через поля модели и на SQLite
+    режет вставку на пачки по 199 строк: при полной переиндексации
+    это основная часть времени. Строки идут в порядке основ, чтобы
+    вставка в индексы по term шла по соседним страницам.
+    """
+    quote = connection.ops.quote_name
+    columns = ('term', 'post_id', 'pub_date', 'weight')
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(SearchPosting._meta.db_table),
+        ', '.join(map(quote, columns)),
+        ', '.join(['%s'] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, sorted(rows))
+    return len(rows)
+
+
+def _replace(rows, **lookup):
+    with transaction.atomic():
+        SearchPosting.objects.filter(**lookup).delete()
+        return _insert(rows)
+
+
+def index_posts(posts):
+    """Заново индексирует переданные посты."""
+    ids = [post.pk for post in posts]
+    documents = _documents(posts, post_id__in=ids)
+    return _replace(_rows(documents), post_id__in=ids)
+
+
+def _analyzed(chunks, workers):
+    """Пачки документов вместе со строками индекса, в исходном порядке.
+
+    Разбор текста — чистый CPU, поэтому идёт в пуле процессов;
+    вперёд разбирается не больше workers пачек.
+    """
+    if workers <= 1:
+        for documents in chunks:
+            yield documents, _rows(documents)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for documents in chunks:
+            pending.append((documents, executor.submit(_rows, documents)))
+            if len(pending) > workers:
+                documents, future = pending.popleft()
+                yield documents, future.result()
+        for documents, future in pending:
+            yield documents, future.result()
+
+
+def reindex(after=0, chunk_size=None, workers=1):
+    """Переиндексирует посты с pk > after пачками в порядке pk.
+
+    Посты читаются потоком через iterator(), в памяти — только
+    пачки в работе. Каждая пачка заменяет свои строки индекса
+    в отдельной транзакции, после коммита генератор отдаёт
+    (последний pk, число постов, число строк): с этого pk
+    переиндексацию можно продолжить.
+    """
+    chunk_size = chunk_size or s.SEARCH_BATCH_SIZE
+    posts = Post.objects.filter(pk__gt=after).order_by('pk').only(
+        'pk', 'text', 'pub_date'
+    ).iterator(chunk_size=chunk_size)
+
+    def chunks():
+        while True:
+            chunk = list(islice(posts, chunk_size))
+            if not chunk:
+                return
+            yield _documents(
+                chunk, post_id__gte=chunk[0].pk, post_id__lte=chunk[-1].pk
+            )
+
+    for documents, rows in _analyzed(chunks(), workers):
+        first, last = documents[0][0], documents[-1][0]
+        count = _replace(rows, post_id__gte=first, post_id__lte=last)
+        yield last, len(documents), count
+
+
+def rebuild():
+    """Пересобирает весь индекс; возвращает число строк."""
+    return sum(count for _, _, count in reindex())
+
+
+def _matches(query):
+    terms = list(dict.fromkeys(analyze(query)))
+    if not terms:
+        return SearchPosting.objects.none()
+    found = SearchPosting.objects.filter(term__in=terms)
+    driver = min(terms, key=lambda term: found.filter(
+        term=term
+    )[:s.SEARCH_COUNT_LIMIT].count())
+    matches = found.filter(term=driver)
+    for number, term in enumerate(terms):
+        if term != driver:
+            matches = matches.annotate(**{
+                f'has_{number}': Exists(SearchPosting.objects.filter(
+                    term=term, post=OuterRef('post')
+                ))
+            }).filter(**{f'has_{number}': True})
+    return matches
+
+
+def search(query):
+    """Посты со всеми словами запроса, от новых к старым.
+
+    Выборку ведёт самое редкое слово: его вхождения читаются
+    по индексу (term, pub_date, post) уже в порядке ленты,
+    остальные слова проверяются подзапросами EXISTS.
+    """
+    return EntryStream(_matches(query).select_related(
+        'post__author', 'post__group'
+    ).only(
+        'post', 'pub_date', *(f'post__{field}' for field in FEED_FIELDS)
+    ).order_by('-pub_date', '-post_id'))
+
+
+def matching_ids(query):
+    """id подходящих постов — для фильтрации других выборок."""
+    return _matches(query).values('post_id')
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings as s
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDB
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+
+class LRU:
+    """Ограниченный словарь в памяти процесса, вытесняет давние ключи.
+
+    Найденные значения хранятся бессрочно (миниатюра не меняется),
+    промахи — недолго: миниатюру может создать другой процесс.
+    """
+
+    def __init__(self, size, miss_timeout):
+        self.size = size
+        self.miss_timeout = miss_timeout
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = None
+        if value == EMPTY_VALUE:
+            expires = time.monotonic() + self.miss_timeout
+        with self.lock:
+            self.data[key] = (value, expires)
+            self.data.move_to_end(key)
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class KVStore(CachedDB):
+    """cached_db с пакетной предзагрузкой и LRU в памяти процесса.
+
+    prefetch() читает метаданные миниатюр всей страницы одним get_many
+    из кэша (и одним запросом к БД для промахов), после чего тег
+    {% post_picture %} обслуживается из LRU без обращений к серверу.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lru = LRU(s.THUMBNAIL_LRU_SIZE, s.THUMBNAIL_LRU_MISS_TIMEOUT)
+
+    def prefetch(self, image_files):
+        keys = {
+            add_prefix(image_file.key, 'image') for image_file in image_files
+        }
+        keys = [key for key in keys if self.lru.get(key) is None]
+        if not keys:
+            return
+        found = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            stored = dict(KVStoreModel.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value'))
+            loaded = {key: stored.get(key, EMPTY_VALUE) for key in missing}
+            self.cache.set_many(loaded, settings.THUMBNAIL_CACHE_TIMEOUT)
+            found.update(loaded)
+        for key, value in found.items():
+            self.lru.set(key, value)
+
+    def _get_raw(self, key):
+        value = self.lru.get(key)
+        if value is None:
+            value = super()._get_raw(key)
+            self.lru.set(key, EMPTY_VALUE if value is None else value)
+            return value
+        if value == EMPTY_VALUE:
+            return None
+        return value
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        self.lru.set(key, value)
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        self.lru.delete(*keys)
+
+    def clear(self, delete_thumbnails=False):
+        super().clear(delete_thumbnails)
+        self.lru.clear()
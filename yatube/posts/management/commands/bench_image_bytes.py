@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from sorl.thumbnail import get_thumbnail
+
+from posts.models import Post
+from posts.thumbnails import variants
+
+LEGACY = ('960x339', {'crop': 'center', 'upscale': True})
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает объём картинок на странице ленты: одна миниатюра '
+        '960x339 против варианта из srcset для заданного экрана'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--viewport', type=int, default=375)
+        parser.add_argument('--dpr', type=float, default=2.0)
+        parser.add_argument('--posts', type=int, default=settings.NUM_REC)
+
+    def size(self, image, geometry, options):
+        thumbnail = get_thumbnail(image, geometry, **options)
+        return thumbnail.storage.size(thumbnail.name)
+
+    def choose(self, needed, image_format):
+        candidates = [
+            variant for variant in variants() if variant[1] == image_format
+        ]
+        adequate = [variant for variant in candidates if variant[0] >= needed]
+        if adequate:
+            return min(adequate, key=lambda variant: variant[0])
+        return max(candidates, key=lambda variant: variant[0])
+
+    def handle(self, *args, **options):
+        posts = list(Post.objects.for_feed().exclude(image='')[
+            :options['posts']
+        ])
+        if not posts:
+            raise CommandError('Нет постов с картинками')
+        needed = options['viewport'] * options['dpr']
+        totals = {'960x339': 0}
+        for post in posts:
+            totals['960x339'] += self.size(post.image, *LEGACY)
+            for image_format in settings.POST_IMAGE_FORMATS:
+                size, _, geometry, variant_options = self.choose(
+                    needed, image_format
+                )
+                label = f'{image_format} {size}w'
+                totals[label] = totals.get(label, 0) + self.size(
+                    post.image, geometry, variant_options
+                )
+        before = totals.pop('960x339')
+        self.stdout.write(
+            f'Постов с картинками: {len(posts)}, '
+            f'экран {options["viewport"]}px x{options["dpr"]:g}'
+        )
+        self.stdout.write(f'До (960x339): {before} байт')
+        for label, total in totals.items():
+            saved = 100 * (before - total) / before if before else 0
+            self.stdout.write(
+                f'После ({label}): {total} байт, экономия {saved:.1f}%'
+            )
@@ -0,0 +1,58 @@
+import statistics
+import time
+from functools import reduce
+from operator import and_
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from posts.fulltext import search
+from posts.models import Post, SearchPosting
+
+QUERIES = ('кофе', 'python django', 'осень поездка город', 'книги фильмы')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает первую страницу поиска: LIKE по тексту постов '
+        '(как search_fields в админке) против поискового индекса'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--query', action='append', dest='queries',
+            help='Запрос для замера (можно несколько)',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def like(self, query):
+        return Post.objects.for_feed().filter(reduce(and_, (
+            Q(text__icontains=word) for word in query.split()
+        )))
+
+    def measure(self, posts, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(posts[:settings.NUM_REC])
+            count = posts.count()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000, count
+
+    def handle(self, *args, **options):
+        if not SearchPosting.objects.exists():
+            raise CommandError('Индекс пуст: выполните reindex_posts')
+        self.stdout.write(f'Постов: {Post.objects.count()}')
+        for query in options['queries'] or QUERIES:
+            like_ms, like_count = self.measure(
+                self.like(query), options['repeat']
+            )
+            index_ms, index_count = self.measure(
+                search(query), options['repeat']
+            )
+            self.stdout.write(
+                f'«{query}»: LIKE {like_ms:.1f} мс ({like_count} постов), '
+                f'индекс {index_ms:.1f} мс ({index_count} постов), '
+                f'ускорение x{like_ms / index_ms:.1f}'
+            )
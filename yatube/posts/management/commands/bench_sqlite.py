@@ -0,0 +1,123 @@
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections
+from django.test.utils import override_settings
+
+from posts.models import Comment, Post, User
+
+# Исходный профиль задаёт журнал явно: режим WAL сохраняется в файле
+# базы и иначе перешёл бы в замер из предыдущего прогона.
+BASELINE = ({'journal_mode': 'DELETE'}, 0)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузка из параллельных чтений ленты и записей комментариев: '
+        'сравнение профилей SQLite (см. SQLITE_PROFILES)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument(
+            '--writes', type=float, default=0.1,
+            help='Доля операций записи',
+        )
+        parser.add_argument(
+            '--profile', action='append', dest='profiles',
+            choices=sorted(settings.SQLITE_PROFILES),
+            help='Профиль для замера (по умолчанию все)',
+        )
+
+    def worker(self, deadline, options, stats, seed):
+        rng = random.Random(seed)
+        latencies, reads, writes, errors = [], 0, 0, 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                if rng.random() < options['writes']:
+                    Comment.objects.create(
+                        post_id=rng.choice(self.post_ids),
+                        author=self.user,
+                        text='Замер нагрузки',
+                    )
+                    writes += 1
+                else:
+                    list(Post.objects.for_feed()[:settings.NUM_REC])
+                    reads += 1
+            except OperationalError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+            # Конец «запроса»: как request_finished в обработчике.
+            close_old_connections()
+        connections['default'].close()
+        stats.append((latencies, reads, writes, errors))
+
+    def run(self, pragmas, max_age, options):
+        database = connections.databases['default']
+        previous = database.get('CONN_MAX_AGE', 0)
+        database['CONN_MAX_AGE'] = max_age
+        connections['default'].close()
+        stats = []
+        try:
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                deadline = time.monotonic() + options['seconds']
+                threads = [
+                    threading.Thread(
+                        target=self.worker,
+                        args=(deadline, options, stats, number),
+                    )
+                    for number in range(options['threads'])
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            database['CONN_MAX_AGE'] = previous
+            connections['default'].close()
+        latencies = sorted(
+            latency for result in stats for latency in result[0]
+        )
+        reads, writes, errors = (
+            sum(result[index] for result in stats) for index in (1, 2, 3)
+        )
+        return {
+            'ops': (reads + writes) / options['seconds'],
+            'reads': reads / options['seconds'],
+            'writes': writes / options['seconds'],
+            'p50': statistics.median(latencies) * 1000,
+            'p95': latencies[int(len(latencies) * 0.95)] * 1000,
+            'errors': errors,
+        }
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('Замер рассчитан на SQLite')
+        self.post_ids = list(Post.objects.values_list('pk', flat=True)[:1000])
+        if not self.post_ids:
+            raise CommandError('Нет постов: выполните seed_yatube')
+        self.user, _ = User.objects.get_or_create(username='bench_sqlite')
+        profiles = {
+            name: BASELINE if name == 'default' else profile
+            for name, profile in settings.SQLITE_PROFILES.items()
+            if not options['profiles'] or name in options['profiles']
+        }
+        try:
+            for name, (pragmas, max_age) in profiles.items():
+                result = self.run(pragmas, max_age, options)
+                self.stdout.write(
+                    f'{name}: {result["ops"]:.0f} оп/с '
+                    f'(чтений {result["reads"]:.0f}, '
+                    f'записей {result["writes"]:.0f}), '
+                    f'p50 {result["p50"]:.1f} мс, '
+                    f'p95 {result["p95"]:.1f} мс, '
+                    f'ошибок блокировки {result["errors"]}'
+                )
+        finally:
+            self.user.delete()
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.feed import EntryStream, MergedFeed, build_feed
+from posts.models import Comment, Post
+from posts.threads import thread
+from posts.utils import CURSOR_ORDERING
+
+SORT_MARKERS = {
+    'sqlite': 'USE TEMP B-TREE',
+    'postgresql': 'Sort',
+    'mysql': 'Using filesort',
+}
+
+
+def querysets(source, ordering):
+    """Разворачивает ленту до SQL-запросов, которые она выполняет."""
+    source = source.order_by(*ordering)
+    if isinstance(source, MergedFeed):
+        for stream in source.streams:
+            yield from querysets(stream, ordering)
+    elif isinstance(source, EntryStream):
+        yield source.entries
+    else:
+        yield source
+
+
+class Command(BaseCommand):
+    help = 'Проверяет через EXPLAIN, что запросы лент идут по индексам'
+
+    def feeds(self):
+        return {
+            'index': Post.objects.for_feed(),
+            'group_posts': Post.objects.for_feed().filter(group_id=0),
+            'profile': Post.objects.for_feed().filter(author_id=0),
+            'follow_index': build_feed(0, [0]),
+        }
+
+    def handle(self, *args, **options):
+        marker = SORT_MARKERS.get(connection.vendor)
+        if marker is None:
+            raise CommandError(f'СУБД {connection.vendor} не поддерживается')
+        plans = []
+        for name, feed in self.feeds().items():
+            for ordering in (('-pub_date',), CURSOR_ORDERING):
+                for queryset in querysets(feed, ordering):
+                    plans.append((name, queryset[:11].explain()))
+        comments = Comment.objects.filter(post_id=0).order_by('path')
+        plans.extend((
+            ('post_detail', comments[:21].explain()),
+            ('post_comments', comments.filter(thread(0))[:21].explain()),
+        ))
+        failed = []
+        for name, plan in plans:
+            self.stdout.write(f'{name}:\n{plan}\n')
+            if marker in plan:
+                failed.append(name)
+        if failed:
+            raise CommandError(
+                'Сортировка без индекса: ' + ', '.join(sorted(set(failed)))
+            )
+        self.stdout.write(self.style.SUCCESS('Все ленты читаются по индексам'))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.dataset import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, посты, комментарии и подписки '
+        'в файлы JSON Lines (по одному на модель)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог для файлов выгрузки')
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Сжимать файлы (.jsonl.gz)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        for name, count in export(
+            options['directory'], options['gzip'], options['chunk_size']
+        ):
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с. '
+            'Файлы картинок в выгрузку не входят: скопируйте MEDIA_ROOT'
+        ))
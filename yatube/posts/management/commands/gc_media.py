@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from posts.media import collect
+
+
+class Command(BaseCommand):
+    help = 'Удаляет картинки постов, на которые больше нет ссылок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60 * 60,
+            help='Не трогать файлы моложе этого числа секунд',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, сколько файлов будет удалено',
+        )
+
+    def handle(self, *args, **options):
+        removed, freed = collect(options['min_age'], options['dry_run'])
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} файлов: {removed}, {filesizeformat(freed)}'
+        ))
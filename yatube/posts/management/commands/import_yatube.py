@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.dataset import DatasetError, Importer
+
+
+class Command(BaseCommand):
+    help = 'Загружает выгрузку export_yatube в текущую базу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог с файлами выгрузки')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--skip-feed', action='store_true',
+            help='Не пересобирать ленты подписок (rebuild_feed позже)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        importer = Importer(
+            options['directory'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        try:
+            importer.run(rebuild_feed=not options['skip_feed'])
+        except DatasetError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с. '
+            'Постройте поисковый индекс: manage.py reindex_posts'
+        ))
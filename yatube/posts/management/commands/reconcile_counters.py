@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Сверяет денормализованные счётчики с фактическими данными'
+
+    def handle(self, *args, **options):
+        for name, repaired in reconcile().items():
+            self.stdout.write(f'{name}: исправлено {repaired}')
+        self.stdout.write(self.style.SUCCESS('Счётчики сверены'))
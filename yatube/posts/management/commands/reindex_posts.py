@@ -0,0 +1,72 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.fulltext import reindex
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает поисковый индекс постов и комментариев пачками '
+        'в порядке pk; прерванную пересборку можно продолжить'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.SEARCH_BATCH_SIZE,
+            help='Постов в пачке',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Процессов для разбора текста (1 — без пула)',
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с последнего сохранённого pk',
+        )
+        parser.add_argument(
+            '--checkpoint', default=settings.SEARCH_CHECKPOINT,
+            help='Файл с последним закоммиченным pk',
+        )
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as checkpoint:
+                return int(checkpoint.read())
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            raise CommandError(f'Повреждён файл {path}')
+
+    def write_checkpoint(self, path, pk):
+        with open(f'{path}.tmp', 'w') as checkpoint:
+            checkpoint.write(str(pk))
+        os.replace(f'{path}.tmp', path)
+
+    def handle(self, *args, **options):
+        path = options['checkpoint']
+        after = self.read_checkpoint(path) if options['resume'] else 0
+        if after:
+            self.stdout.write(f'Продолжаем после pk={after}')
+        started = time.monotonic()
+        total_posts = total_rows = 0
+        for last_pk, posts, rows in reindex(
+            after, options['chunk_size'], options['workers']
+        ):
+            self.write_checkpoint(path, last_pk)
+            total_posts += posts
+            total_rows += rows
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'pk ≤ {last_pk}: постов {total_posts}, '
+                f'{total_posts / elapsed:.0f} постов/с, '
+                f'{total_rows / elapsed:.0f} строк индекса/с'
+            )
+        if os.path.exists(path):
+            os.remove(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс пересобран: постов {total_posts}, строк {total_rows}, '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими пользователями, постами и подписками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора: одинаковое зерно даёт одинаковые данные',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить даты публикаций',
+        )
+        parser.add_argument(
+            '--follower-alpha', type=float, default=1.2,
+            help='Параметр Парето для популярности авторов',
+        )
+        parser.add_argument(
+            '--group-skew', type=float, default=1.1,
+            help='Показатель закона Ципфа для популярности групп',
+        )
+        parser.add_argument(
+            '--ungrouped', type=float, default=0.3,
+            help='Доля постов без группы',
+        )
+        parser.add_argument(
+            '--skip-feed', action='store_true',
+            help='Не пересобирать ленты подписок (rebuild_feed позже)',
+        )
+        parser.add_argument(
+            '--skip-search', action='store_true',
+            help='Не строить поисковый индекс (reindex_posts позже)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        seeder = Seeder(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            days=options['days'],
+            follower_alpha=options['follower_alpha'],
+            group_skew=options['group_skew'],
+            ungrouped=options['ungrouped'],
+            log=self.stdout.write,
+        )
+        seeder.run(
+            rebuild_feed=not options['skip_feed'],
+            rebuild_search=not options['skip_search'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с'
+        ))
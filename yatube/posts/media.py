@@ -0,0 +1,61 @@
+import os
+import time
+
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post
+
+
+def stored_files(storage, path):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield os.path.join(path, name).replace('\\', '/')
+    for directory in directories:
+        yield from stored_files(
+            storage, os.path.join(path, directory).replace('\\', '/')
+        )
+
+
+def orphans(min_age=0):
+    """Файлы картинок, на которые не ссылается ни один пост.
+
+    Счётчик ссылок на файл — число постов с ним в Post.image.
+
+    Свежие файлы пропускаются: пост с ними может быть ещё не сохранён.
+    """
+    field = Post._meta.get_field('image')
+    storage = field.storage
+    root = field.upload_to.rstrip('/')
+    if not storage.exists(root):
+        return
+    referenced = set(
+        Post.objects.exclude(image='').values_list('image', flat=True)
+    )
+    deadline = time.time() - min_age
+    for name in stored_files(storage, root):
+        if name in referenced:
+            continue
+        if os.path.getmtime(storage.path(name)) > deadline:
+            continue
+        yield name
+
+
+def collect(min_age=0, dry_run=False):
+    """Удаляет сиротские картинки вместе с их миниатюрами.
+
+    Возвращает число файлов и освобождённых байт (без миниатюр).
+    """
+    storage = Post._meta.get_field('image').storage
+    removed = freed = 0
+    for name in orphans(min_age):
+        # Ссылка могла появиться после выборки в orphans().
+        if not dry_run and Post.objects.filter(image=name).exists():
+            continue
+        freed += storage.size(name)
+        removed += 1
+        if dry_run:
+            continue
+        default.kvstore.delete(ImageFile(name, storage))
+        storage.delete(name)
+    return removed, freed
@@ -1,13 +1,31 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+
+from core.models import CountersModel
+from core.storage import ContentHashStorage
 
 User = get_user_model()
 
+COMMENT_PATH_WIDTH = 10
+
+
+def comment_path(parent_path, pk):
+    """Путь комментария: путь родителя и pk фиксированной ширины."""
+    return parent_path + str(pk).zfill(COMMENT_PATH_WIDTH)
 
-class Group(models.Model):
+
+class Group(CountersModel):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('posts_count',)
 
     class Meta:
         verbose_name = 'Группа'
@@ -17,7 +35,28 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+FEED_FIELDS = (
+    'id',
+    'text',
+    'pub_date',
+    'image',
+    'author',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group',
+    'group__slug',
+    'group__title',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для лент: автор и группа одним запросом, нужные поля."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+
+class Post(CountersModel):
     text = models.TextField(
         verbose_name='Текст поста',
         help_text='Введите текст поста'
@@ -44,13 +83,34 @@ class Post(models.Model):
     image = models.ImageField(
         verbose_name='Картинка',
         upload_to='posts/',
+        storage=ContentHashStorage(),
         blank=True,
+        db_index=True,
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
+    counter_fields = ('comments_count',)
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['group', 'pub_date'],
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='post_author_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -77,6 +137,53 @@ class Comment(models.Model):
         verbose_name='Текст комментария',
         help_text='Введите текст комментария'
     )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        related_name='replies',
+        blank=True,
+        null=True,
+        verbose_name='Ответ на комментарий',
+    )
+    path = models.CharField(
+        'Путь в ветке',
+        max_length=255,
+        default='',
+        editable=False,
+    )
+    depth = models.PositiveSmallIntegerField(
+        'Уровень вложенности',
+        default=0,
+        editable=False,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'path'],
+                name='comment_post_path_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Новому комментарию вычисляет path и depth после вставки.
+
+        Сортировка по path выстраивает ветку целиком, поддерево —
+        диапазон путей с общим префиксом. Ответ глубже
+        COMMENT_MAX_DEPTH становится соседом родителя.
+        """
+        if self.path:
+            return super().save(*args, **kwargs)
+        parent = self.parent
+        max_depth = settings.COMMENT_MAX_DEPTH
+        while parent is not None and parent.depth >= max_depth:
+            parent = parent.parent
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.path = comment_path(parent.path if parent else '', self.pk)
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
 
 
 class Follow(models.Model):
@@ -100,3 +207,95 @@ class Follow(models.Model):
                 fields=['user', 'author'],
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
+
+
+class UserCounter(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_feed_entry',
+                fields=['user', 'post'],
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='feed_user_pub_date_idx',
+            ),
+        ]
+
+
+class SearchPosting(models.Model):
+    term = models.CharField('Основа слова', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_postings',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+    weight = models.IntegerField('Число вхождений', default=0)
+
+    class Meta:
+        verbose_name = 'Вхождение слова'
+        verbose_name_plural = 'Поисковый индекс'
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_search_posting',
+                fields=['term', 'post'],
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['term', 'pub_date', 'post'],
+                name='search_term_pub_date_idx',
+            ),
+        ]
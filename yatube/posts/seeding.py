@@ -0,0 +1,222 @@
+import bisect
+import datetime
+import random
+from array import array
+from contextlib import contextmanager
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from . import counters, feed, fulltext
+from .models import Comment, Follow, Group, Post, User, comment_path
+
+WORDS = (
+    'пост', 'новость', 'группа', 'автор', 'сегодня', 'вчера', 'город',
+    'книга', 'фильм', 'музыка', 'код', 'python', 'django', 'погода',
+    'поездка', 'работа', 'кофе', 'идея', 'вопрос', 'ответ', 'проект',
+    'лето', 'зима', 'весна', 'осень', 'друг', 'семья', 'спорт', 'игра',
+)
+
+# Даты отсчитываются назад от фиксированного момента, а не от часов:
+# иначе два запуска с одним seed давали бы разные pub_date.
+EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+@contextmanager
+def explicit_dates(*models):
+    """Отключает auto_now_add, чтобы bulk_create сохранил pub_date."""
+    fields = [model._meta.get_field('pub_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def next_pk(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+def reset_sequences(*models):
+    """Сдвигает автоинкремент за pk, вставленные явно."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+class Seeder:
+    """Генератор синтетических данных для нагрузочного тестирования.
+
+    Популярность авторов распределена по Парето (немного звёзд с
+    огромным числом подписчиков), группы выбираются по закону Ципфа.
+    Одинаковый seed даёт одинаковые данные.
+    """
+
+    def __init__(self, users=1000, groups=20, posts=10000, comments=20000,
+                 follows=10000, seed=0, batch_size=5000, days=365,
+                 follower_alpha=1.2, group_skew=1.1, ungrouped=0.3,
+                 log=None):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows = follows
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.days = days
+        self.follower_alpha = follower_alpha
+        self.group_skew = group_skew
+        self.ungrouped = ungrouped
+        self.log = log or (lambda message: None)
+        self.now = EPOCH
+
+    def _insert(self, model, objects):
+        objects = iter(objects)
+        created = 0
+        with transaction.atomic():
+            while True:
+                batch = list(islice(objects, self.batch_size))
+                if not batch:
+                    break
+                model.objects.bulk_create(batch)
+                created += len(batch)
+        self.log(f'{model.__name__}: {created}')
+        return created
+
+    def _text(self):
+        return ' '.join(
+            self.rng.choices(WORDS, k=self.rng.randint(5, 40))
+        ).capitalize()
+
+    def _pick(self, first_pk, cum_weights):
+        index = bisect.bisect(cum_weights, self.rng.random() * cum_weights[-1])
+        return first_pk + min(index, len(cum_weights) - 1)
+
+    def seed_users(self):
+        self.first_user = next_pk(User)
+        # Соль из seed: хэши паролей тоже одинаковы от запуска к запуску.
+        password = make_password('password', salt=f'seed{self.seed}')
+        self._insert(User, (
+            User(pk=pk, username=f'seed{pk}', password=password,
+                 first_name='Имя', last_name=f'Фамилия {pk}')
+            for pk in range(self.first_user, self.first_user + self.users)
+        ))
+        self.popularity = list(accumulate(
+            self.rng.paretovariate(self.follower_alpha)
+            for _ in range(self.users)
+        ))
+
+    def seed_groups(self):
+        self.first_group = next_pk(Group)
+        self._insert(Group, (
+            Group(pk=pk, title=f'Группа {pk}', slug=f'seed-group-{pk}',
+                  description=self._text())
+            for pk in range(self.first_group, self.first_group + self.groups)
+        ))
+        self.group_weights = list(accumulate(
+            1 / rank ** self.group_skew for rank in range(1, self.groups + 1)
+        ))
+
+    def seed_posts(self):
+        self.first_post = next_pk(Post)
+        self.post_dates = array('d')
+        span = self.days * 24 * 60 * 60
+
+        def posts():
+            for pk in range(self.first_post, self.first_post + self.posts):
+                pub_date = self.now - datetime.timedelta(
+                    seconds=self.rng.random() * span
+                )
+                self.post_dates.append(pub_date.timestamp())
+                group_id = None
+                if self.groups and self.rng.random() >= self.ungrouped:
+                    group_id = self._pick(self.first_group, self.group_weights)
+                yield Post(
+                    pk=pk,
+                    text=self._text(),
+                    author_id=self._pick(self.first_user, self.popularity),
+                    group_id=group_id,
+                    pub_date=pub_date,
+                )
+
+        with explicit_dates(Post):
+            self._insert(Post, posts())
+
+    def seed_comments(self):
+        now = self.now.timestamp()
+        first_comment = next_pk(Comment)
+
+        def comments():
+            for pk in range(first_comment, first_comment + self.comments):
+                index = self.rng.randrange(self.posts)
+                posted = self.post_dates[index]
+                yield Comment(
+                    pk=pk,
+                    path=comment_path('', pk),
+                    post_id=self.first_post + index,
+                    author_id=self.rng.randrange(
+                        self.first_user, self.first_user + self.users
+                    ),
+                    text=self._text(),
+                    pub_date=datetime.datetime.fromtimestamp(
+                        posted + self.rng.random() * (now - posted),
+                        tz=datetime.timezone.utc,
+                    ),
+                )
+
+        with explicit_dates(Comment):
+            self._insert(Comment, comments())
+
+    def seed_follows(self):
+        if not self.follows:
+            return
+        per_user = self.follows / self.users
+
+        def follows():
+            left = self.follows
+            for user_id in range(self.first_user,
+                                 self.first_user + self.users):
+                wanted = min(
+                    left, self.users - 1,
+                    int(self.rng.expovariate(1 / per_user) + 0.5),
+                )
+                authors = set()
+                for _ in range(wanted * 2):
+                    if len(authors) >= wanted:
+                        break
+                    author_id = self._pick(self.first_user, self.popularity)
+                    if author_id != user_id:
+                        authors.add(author_id)
+                left -= len(authors)
+                for author_id in authors:
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        self._insert(Follow, follows())
+
+    def reset_sequences(self):
+        reset_sequences(User, Group, Post, Comment, Follow)
+
+    def run(self, rebuild_feed=True, rebuild_search=True):
+        self.seed_users()
+        self.seed_groups()
+        if self.users:
+            self.seed_posts()
+            if self.posts:
+                self.seed_comments()
+            self.seed_follows()
+        self.reset_sequences()
+        counters.reconcile()
+        self.log('Счётчики пересчитаны')
+        if rebuild_feed:
+            feed.rebuild()
+            self.log('Ленты подписок пересобраны')
+        if rebuild_search:
+            fulltext.rebuild()
+            self.log('Поисковый индекс пересобран')
@@ -0,0 +1,157 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import counters, feed, fulltext
+from .cache import bump, post_scopes
+from .models import Comment, Follow, Group, Post, User, UserCounter
+
+
+@receiver(post_save, sender=User)
+def create_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounter.objects.get_or_create(user=instance)
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._initial_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_init, sender=Post)
+@receiver(post_init, sender=Comment)
+def remember_text(sender, instance, **kwargs):
+    instance._initial_text = instance.__dict__.get('text')
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    groups = Group.objects.all()
+    if created:
+        counters.change_user(instance.author_id, 'posts_count', 1)
+        if instance.group_id is not None:
+            counters.change(
+                groups.filter(pk=instance.group_id), 'posts_count', 1
+            )
+    elif instance._initial_group_id != instance.group_id:
+        counters.change(
+            groups.filter(pk=instance._initial_group_id), 'posts_count', -1
+        )
+        counters.change(
+            groups.filter(pk=instance.group_id), 'posts_count', 1
+        )
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, 'posts_count', -1)
+    counters.change(
+        Group.objects.filter(pk=instance.group_id), 'posts_count', -1
+    )
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    bump(*post_scopes(instance, instance._initial_group_id))
+    instance._initial_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        fulltext.change(instance.pk, instance.pub_date, '', instance.text)
+    elif instance._initial_text is None:
+        fulltext.index_posts([instance])
+    elif instance._initial_text != instance.text:
+        fulltext.change(
+            instance.pk, instance.pub_date,
+            instance._initial_text, instance.text,
+        )
+    instance._initial_text = instance.text
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        fulltext.change(
+            instance.post_id, instance.post.pub_date, '', instance.text
+        )
+    elif instance._initial_text is None:
+        fulltext.index_posts([instance.post])
+    elif instance._initial_text != instance.text:
+        fulltext.change(
+            instance.post_id, instance.post.pub_date,
+            instance._initial_text, instance.text,
+        )
+    instance._initial_text = instance.text
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    fulltext.change(instance.post_id, None, instance.text, '')
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change(
+            Post.objects.filter(pk=instance.post_id), 'comments_count', 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.change(
+        Post.objects.filter(pk=instance.post_id), 'comments_count', -1
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments(sender, instance, **kwargs):
+    bump(('post', instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    bump(('group', instance.pk))
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user(instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, 'followers_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow(sender, instance, **kwargs):
+    bump(('author', instance.author_id))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_feed(sender, instance, **kwargs):
+    feed.trim(instance.user_id, instance.author_id)
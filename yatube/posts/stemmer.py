@@ -0,0 +1,78 @@
+"""Стеммер Портера (Snowball) для русского языка."""
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = re.compile(
+    r'(ив|ивши|ившись|ыв|ывши|ывшись|(?<=[ая])(в|вши|вшись))$'
+)
+REFLEXIVE = re.compile(r'(ся|сь)$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых'
+    r'|ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'(ивш|ывш|ующ|(?<=[ая])(ем|нн|вш|ющ|щ))$')
+VERB = re.compile(
+    r'(ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено'
+    r'|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю'
+    r'|(?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем'
+    r'|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+SUPERLATIVE = re.compile(r'(ейш|ейше)$')
+DERIVATIONAL = re.compile(r'(ост|ость)$')
+
+
+def _region(word, start=0):
+    """Начало области после первой пары «гласная + согласная»."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _strip(pattern, word):
+    return pattern.sub('', word, count=1)
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    """Основа слова; ё приравнивается к е."""
+    word = word.lower().replace('ё', 'е')
+    rv_start = next(
+        (index + 1 for index, char in enumerate(word) if char in VOWELS),
+        len(word),
+    )
+    r2_start = _region(word, _region(word) - 1)
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    stripped = _strip(PERFECTIVE_GERUND, rv)
+    if stripped == rv:
+        rv = _strip(REFLEXIVE, rv)
+        stripped = _strip(ADJECTIVE, rv)
+        if stripped != rv:
+            stripped = _strip(PARTICIPLE, stripped)
+        else:
+            stripped = _strip(VERB, rv)
+            if stripped == rv:
+                stripped = _strip(NOUN, rv)
+    rv = stripped
+
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    match = DERIVATIONAL.search(rv)
+    if match and rv_start + match.start() >= r2_start:
+        rv = rv[:match.start()]
+
+    stripped = _strip(SUPERLATIVE, rv)
+    if rv.endswith('нн') or stripped != rv and stripped.endswith('нн'):
+        rv = stripped[:-1]
+    elif stripped != rv:
+        rv = stripped
+    elif rv.endswith('ь'):
+        rv = rv[:-1]
+    return prefix + rv
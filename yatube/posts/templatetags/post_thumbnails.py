@@ -0,0 +1,40 @@
+from django import template
+from django.conf import settings
+
+from ..thumbnails import MIME_TYPES, picture, prefetch
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts):
+    """Читает метаданные всех миниатюр страницы одним запросом."""
+    prefetch(posts)
+    return ''
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(image):
+    """<picture> с srcset по ширинам: WebP и запасной формат.
+
+    Плейсхолдер выводится, только пока миниатюры картинки не готовы.
+    """
+    ready = picture(image) if image else {}
+    sources = {
+        image_format: {
+            'type': MIME_TYPES.get(image_format, ''),
+            'srcset': ', '.join(f'{url} {size}w' for size, url in urls),
+            'src': urls[-1][1],
+        }
+        for image_format, urls in ready.items()
+    }
+    *modern, fallback = settings.POST_IMAGE_FORMATS
+    width, height = settings.POST_IMAGE_SIZE
+    return {
+        'has_image': bool(image),
+        'sources': [sources[name] for name in modern if name in sources],
+        'fallback': sources.get(fallback),
+        'sizes': settings.POST_IMAGE_SIZES,
+        'width': width,
+        'height': height,
+    }
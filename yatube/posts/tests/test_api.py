@@ -0,0 +1,119 @@
+import time
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+from posts.models import Comment, Follow, Group, Post, User
+
+
+@override_settings(NUM_REC=2)
+class ApiTest(TestCase):
+    """JSON API лент: поля, курсоры и условные запросы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Пост {number}', group=cls.group
+            )
+            for number in range(3)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(f'api:{name}', args=args), params)
+
+    def test_cursor_pagination(self):
+        """Курсор next ведёт на следующую порцию, поля сокращаются."""
+        first = self.get('posts', fields='id,author').json()
+        self.assertEqual(first['results'], [
+            {'id': self.posts[2].pk, 'author': 'author'},
+            {'id': self.posts[1].pk, 'author': 'author'},
+        ])
+        second = self.get('posts', cursor=first['next'], fields='id').json()
+        self.assertEqual(second['results'], [{'id': self.posts[0].pk}])
+        self.assertIsNone(second['next'])
+
+    def test_unknown_field(self):
+        """Неизвестное поле в ?fields= — ошибка 400."""
+        response = self.get('posts', fields='id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_scoped_feeds(self):
+        """Лента группы, профиля и подписок отдают те же посты."""
+        for name, args in (
+            ('group_posts', [self.group.slug]),
+            ('profile_posts', [self.user.username]),
+            ('follow_posts', []),
+        ):
+            with self.subTest(name=name):
+                self.client.force_login(self.reader)
+                response = self.get(name, *args, fields='id')
+                self.assertEqual(
+                    [post['id'] for post in response.json()['results']],
+                    [self.posts[2].pk, self.posts[1].pk],
+                )
+        self.client.logout()
+        self.assertEqual(self.get('follow_posts').status_code, 401)
+        self.assertEqual(self.get('group_posts', 'missing').status_code, 404)
+
+    def test_not_modified(self):
+        """Повтор с ETag без изменений — 304 без запросов к базе."""
+        response = self.get('posts')
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('api:posts'), HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.client.get(
+            reverse('api:posts'), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_edit_not_hidden_by_if_modified_since(self):
+        """Правка поста не прячется за If-Modified-Since."""
+        post = self.posts[2]
+        post.text = 'Исправленный пост'
+        post.save()
+        response = self.client.get(
+            reverse('api:posts'),
+            HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['results'][0]['text'], 'Исправленный пост'
+        )
+
+    def test_post_detail_with_comments(self):
+        """Пост отдаётся с комментариями, новый комментарий меняет ETag."""
+        post = self.posts[0]
+        root = Comment.objects.create(post=post, author=self.user, text='А')
+        Comment.objects.create(
+            post=post, author=self.reader, text='Б', parent=root
+        )
+        response = self.get('post_detail', post.pk)
+        data = response.json()
+        self.assertEqual(data['post']['comments_count'], 2)
+        self.assertEqual(
+            [(c['text'], c['depth']) for c in data['comments']['results']],
+            [('А', 0), ('Б', 1)],
+        )
+        etag = response['ETag']
+        Comment.objects.create(post=post, author=self.user, text='В')
+        response = self.client.get(
+            reverse('api:post_detail', args=[post.pk]),
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,166 @@
+import threading
+import time
+from unittest import mock
+
+from core.cache.backends import RedisCache
+from core.cache.server import RespServer
+from core.cache.stampede import fetch
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from posts.cache import bump, get_version
+from posts.models import Post, User
+
+
+class RedisCacheTest(SimpleTestCase):
+    """Бэкенд RedisCache поверх сервера-заглушки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = RespServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache = RedisCache(self.server.url, {})
+        self.cache.clear()
+
+    def test_set_get_delete(self):
+        """Значения любых типов сохраняются, читаются и удаляются."""
+        self.cache.set('post', {'text': 'Текст', 'id': 1})
+        self.assertEqual(self.cache.get('post'), {'text': 'Текст', 'id': 1})
+        self.cache.delete('post')
+        self.assertIsNone(self.cache.get('post'))
+        self.assertEqual(self.cache.get('post', 'нет'), 'нет')
+
+    def test_add_and_incr(self):
+        """add не перезаписывает ключ, incr атомарен и требует ключ."""
+        self.assertTrue(self.cache.add('version', 1, None))
+        self.assertFalse(self.cache.add('version', 5, None))
+        self.assertEqual(self.cache.incr('version', 2), 3)
+        self.assertEqual(self.cache.get('version'), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_does_not_resurrect_key(self):
+        """incr — одна команда: удалённый рядом ключ не воскресает."""
+        other = RedisCache(self.server.url, {})
+        self.cache.set('version', 1, None)
+        execute = self.cache._client.execute
+
+        def racing(*command):
+            reply = execute(*command)
+            other.delete('version')
+            return reply
+
+        with mock.patch.object(self.cache._client, 'execute', racing):
+            self.assertEqual(self.cache.incr('version'), 2)
+            with self.assertRaises(ValueError):
+                self.cache.incr('version')
+        self.assertFalse(self.cache.has_key('version'))
+
+    def test_many_and_timeout(self):
+        """get_many пропускает отсутствующие ключи, ключи истекают."""
+        self.cache.set_many({'a': 1, 'b': 'два'})
+        self.cache.set('short', 'значение', 0.05)
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 'два'}
+        )
+        time.sleep(0.1)
+        self.assertFalse(self.cache.has_key('short'))
+
+    def test_shared_between_clients(self):
+        """Версии кэша видны всем клиентам одного сервера."""
+        other = RedisCache(self.server.url, {})
+        with mock.patch('posts.cache.cache', self.cache):
+            before = get_version(('group', 1))
+        with mock.patch('posts.cache.cache', other):
+            bump(('group', 1))
+        with mock.patch('posts.cache.cache', self.cache):
+            self.assertNotEqual(get_version(('group', 1)), before)
+
+
+@override_settings(
+    FRAGMENT_CACHE_BETA=1.0,
+    FRAGMENT_CACHE_LOCK_TIMEOUT=30,
+    FRAGMENT_CACHE_WAIT=1,
+)
+class StampedeTest(SimpleTestCase):
+    """Защита фрагментов от одновременного пересчёта."""
+
+    def setUp(self):
+        self.cache = LocMemCache('stampede', {})
+        self.cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        time.sleep(0.05)
+        return f'фрагмент {self.calls}'
+
+    def test_single_computation_on_cold_cache(self):
+        """При пустом кэше фрагмент вычисляет только один поток."""
+        results = []
+
+        def worker():
+            results.append(fetch(self.cache, 'key', self.compute, 60))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ['фрагмент 1'] * 5)
+
+    @mock.patch('core.cache.stampede.random.random', return_value=0.5)
+    def test_early_recompute_under_lock(self, random):
+        """Близкая к истечению запись пересчитывается одним владельцем."""
+        self.cache.set('key', ('старый', 10, time.time() + 1), 60)
+        self.cache.add('key:lock', 1)
+        self.assertEqual(fetch(self.cache, 'key', self.compute, 60), 'старый')
+        self.assertEqual(self.calls, 0)
+        self.cache.delete('key:lock')
+        self.assertEqual(
+            fetch(self.cache, 'key', self.compute, 60), 'фрагмент 1'
+        )
+        self.assertEqual(self.cache.get('key')[0], 'фрагмент 1')
+
+    def test_fresh_value_served(self):
+        """Свежая запись отдаётся без пересчёта."""
+        fetch(self.cache, 'key', self.compute, 60)
+        for _ in range(10):
+            fetch(self.cache, 'key', self.compute, 60)
+        self.assertEqual(self.calls, 1)
+
+
+class RedisViewsTest(TestCase):
+    """Страницы работают с кэшем на сервере с протоколом Redis."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = RespServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def test_index_invalidated_through_shared_cache(self):
+        """Новый пост виден на главной после сброса общей версии."""
+        caches = {'default': {
+            'BACKEND': 'core.cache.backends.RedisCache',
+            'LOCATION': self.server.url,
+        }}
+        user = User.objects.create_user(username='author')
+        with override_settings(CACHES=caches):
+            client = Client()
+            client.get(reverse('posts:index'))
+            Post.objects.create(author=user, text='Общий кэш')
+            response = client.get(reverse('posts:index'))
+            self.assertContains(response, 'Общий кэш')
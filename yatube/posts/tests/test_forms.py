@@ -1,11 +1,13 @@
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 from posts.models import Group, Post
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -121,3 +123,64 @@ class PostFormTests(TestCase):
             reverse('posts:group_list', args=[self.group.slug])
         )
         self.assertEqual(group2.context['page_obj'].paginator.count, 0)
+
+
+def image_file(name, size, image_format='JPEG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, image_format)
+    return SimpleUploadedFile(
+        name=name, content=buffer.getvalue(), content_type='image/jpeg'
+    )
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    UPLOAD_MAX_SIZE=64 * 1024,
+    IMAGE_MAX_PIXELS=4000 * 3000,
+    IMAGE_MAX_SIDE=400,
+)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(username='uploader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create(self, image):
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Картинка', 'image': image},
+        )
+
+    def test_oversized_file_rejected(self):
+        """Файл больше лимита отбрасывается при загрузке с ошибкой формы."""
+        noise = SimpleUploadedFile(
+            name='big.jpg', content=b'\xff' * (200 * 1024),
+            content_type='image/jpeg',
+        )
+        response = self.create(noise)
+        errors = response.context['form'].errors.as_data()['image']
+        self.assertEqual(errors[0].code, 'file_too_large')
+        self.assertFalse(Post.objects.exists())
+
+    def test_too_many_pixels_rejected(self):
+        """Изображение с огромным разрешением отклоняется по заголовку."""
+        response = self.create(image_file('huge.png', (5000, 3000), 'PNG'))
+        self.assertFormError(
+            response, 'form', 'image', 'Изображение больше 12 мегапикселей.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_large_image_downscaled(self):
+        """Крупное изображение уменьшается до допустимой стороны."""
+        self.create(image_file('wide.jpg', (1600, 800)))
+        post = Post.objects.get()
+        self.assertEqual((post.image.width, post.image.height), (400, 200))
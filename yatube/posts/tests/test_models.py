@@ -1,10 +1,33 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
 
-from ..models import Group, Post
+from .. import media
+from ..kvstore import LRU
+from ..models import Comment, FeedEntry, Follow, Group, Post, UserCounter
 
 User = get_user_model()
 
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
 
 class PostModelTest(TestCase):
     @classmethod
@@ -68,3 +91,281 @@ class GroupModelTest(TestCase):
         group = GroupModelTest.group
         expected_object_name = group.title
         self.assertEqual(expected_object_name, str(group))
+
+
+class SeedCommandTest(TestCase):
+    def seed(self):
+        call_command(
+            'seed_yatube', users=30, groups=3, posts=200, comments=100,
+            follows=60, seed=7, stdout=StringIO(),
+        )
+
+    def test_seed_counts(self):
+        """seed_yatube создаёт заданное число записей и ленты."""
+        self.seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(FeedEntry.objects.exists())
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 1
+        )
+
+    def test_seed_reproducible(self):
+        """Одинаковое зерно даёт одинаковые данные."""
+        self.seed()
+        first = list(Post.objects.order_by('pk').values_list(
+            'text', 'pub_date', 'author__username', 'author__password',
+            'group__slug',
+        ))
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+        self.seed()
+        second = list(Post.objects.order_by('pk').values_list(
+            'text', 'pub_date', 'author__username', 'author__password',
+            'group__slug',
+        ))
+        self.assertEqual(first, second)
+
+
+class DatasetCommandTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        call_command(
+            'seed_yatube', users=10, groups=2, posts=30, comments=20,
+            follows=15, seed=3, stdout=StringIO(),
+        )
+        Post.objects.filter(pk=Post.objects.order_by('pk')[0].pk).update(
+            image='posts/ab/abcdef.gif'
+        )
+        root = Comment.objects.order_by('pk')[0]
+        Comment.objects.create(
+            post=root.post, author=root.author, text='Ответ', parent=root,
+        )
+
+    def snapshot(self):
+        return {
+            'posts': sorted(Post.objects.values_list(
+                'text', 'pub_date', 'author__username', 'group__slug',
+                'image', 'comments_count',
+            ), key=str),
+            'comments': sorted(Comment.objects.values_list(
+                'post__text', 'author__username', 'text', 'pub_date',
+                'parent__text', 'depth',
+            ), key=str),
+            'follows': sorted(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+        }
+
+    def test_round_trip(self):
+        """Выгрузка в gzip и загрузка в пустую базу сохраняют данные."""
+        before = self.snapshot()
+        pks = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+        call_command(
+            'export_yatube', self.directory, gzip=True, stdout=StringIO()
+        )
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        call_command(
+            'import_yatube', self.directory, batch_size=7, stdout=StringIO()
+        )
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('pk', flat=True)),
+            pks,
+        )
+        self.assertEqual(UserCounter.objects.count(), User.objects.count())
+        self.assertTrue(FeedEntry.objects.exists())
+
+    def test_import_merges_users_and_groups(self):
+        """Пользователи и группы сопоставляются, посты получают новые pk."""
+        call_command('export_yatube', self.directory, stdout=StringIO())
+        users, groups = User.objects.count(), Group.objects.count()
+        call_command(
+            'import_yatube', self.directory, skip_feed=True,
+            stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), users)
+        self.assertEqual(Group.objects.count(), groups)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 42)
+        for path, parent_path in Comment.objects.filter(
+            parent__isnull=False
+        ).values_list('path', 'parent__path'):
+            self.assertTrue(path.startswith(parent_path))
+
+
+class FeedIndexTest(TestCase):
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент сортируются по индексам, без временного B-дерева."""
+        out = StringIO()
+        call_command('check_feed_indexes', stdout=out)
+        self.assertIn('post_group_pub_date_idx', out.getvalue())
+        self.assertIn('feed_user_pub_date_idx', out.getvalue())
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.other = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+
+    def counters(self, user):
+        return UserCounter.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Создание, перенос и удаление поста меняют счётчики."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group
+        )
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post.group = self.other
+        post.save()
+        self.group.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other.posts_count, 1)
+        post.delete()
+        self.other.refresh_from_db()
+        self.assertEqual(self.counters(self.author).posts_count, 0)
+        self.assertEqual(self.other.posts_count, 0)
+
+    def test_comment_and_follow_counters(self):
+        """Комментарии и подписки меняют счётчики."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        follow.delete()
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+
+    def test_save_keeps_counters(self):
+        """Сохранение устаревшего объекта не затирает счётчик."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        post.text = 'Новый текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_reconcile_counters(self):
+        """reconcile_counters исправляет разошедшиеся счётчики."""
+        Post.objects.create(author=self.author, text='Пост', group=self.group)
+        UserCounter.objects.filter(user=self.author).update(posts_count=5)
+        Group.objects.update(posts_count=0)
+        UserCounter.objects.filter(user=self.reader).delete()
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.reader).posts_count, 0)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertIn('users.posts_count: исправлено 1', out.getvalue())
+
+
+class ThumbnailLRUTest(TestCase):
+    def test_lru_bounded(self):
+        """LRU вытесняет давние ключи и недолго помнит промахи."""
+        lru = LRU(size=2, miss_timeout=0)
+        lru.set('a', 'A')
+        lru.set('b', 'B')
+        lru.get('a')
+        lru.set('c', 'C')
+        self.assertEqual(lru.get('a'), 'A')
+        self.assertIsNone(lru.get('b'))
+        lru.set('miss', EMPTY_VALUE)
+        self.assertIsNone(lru.get('miss'))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentHashStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def post(self, name, content=SMALL_GIF):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост',
+            image=SimpleUploadedFile(name, content, 'image/gif'),
+        )
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые загрузки хранятся одним файлом с именем по хэшу."""
+        first = self.post('first.gif')
+        second = self.post('second.GIF')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.gif$'
+        )
+        self.assertEqual(
+            os.listdir(os.path.dirname(first.image.path)),
+            [os.path.basename(first.image.path)],
+        )
+
+    def test_gc_removes_only_orphans(self):
+        """gc_media удаляет файл, только когда на него нет ссылок."""
+        first = self.post('first.gif')
+        second = self.post('second.gif')
+        other = self.post('other.gif', SMALL_GIF + b'\x00')
+        path, other_path = first.image.path, other.image.path
+        first.delete()
+        call_command('gc_media', min_age=0, stdout=StringIO())
+        self.assertTrue(os.path.exists(path))
+        second.delete()
+        out = StringIO()
+        call_command('gc_media', min_age=0, stdout=out)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(other_path))
+        self.assertIn('Удалено файлов: 1', out.getvalue())
+
+    def test_duplicate_upload_refreshes_mtime(self):
+        """Повторная загрузка старого сироты защищает его от gc_media."""
+        post = self.post('first.gif')
+        name, path = post.image.name, post.image.path
+        post.delete()
+        os.utime(path, (0, 0))
+        storage = Post._meta.get_field('image').storage
+        self.assertEqual(
+            storage.save('posts/second.gif', SimpleUploadedFile(
+                'second.gif', SMALL_GIF, 'image/gif'
+            )),
+            name,
+        )
+        self.assertEqual(media.collect(min_age=3600), (0, 0))
+        self.assertTrue(os.path.exists(path))
+
+    def test_gc_rechecks_reference_before_delete(self):
+        """Файл, на который сослались после поиска сирот, не удаляется."""
+        post = self.post('first.gif')
+        with mock.patch.object(
+            media, 'orphans', return_value=iter([post.image.name])
+        ):
+            self.assertEqual(media.collect(), (0, 0))
+        self.assertTrue(os.path.exists(post.image.path))
@@ -0,0 +1,140 @@
+import json
+import os
+import time
+
+from about import urls as about_urls
+from api import urls as api_urls
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test import Client, TestCase, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from posts import urls as posts_urls
+from posts.models import Group, Post, User
+from posts.seeding import Seeder
+from users import urls as users_urls
+
+REPORT_PATH = os.environ.get(
+    'PERF_REPORT', os.path.join(settings.BASE_DIR, 'perf_report.json')
+)
+ROUNDS = 20
+
+DATASET = {
+    'users': 2000,
+    'groups': 20,
+    'posts': 5000,
+    'comments': 10000,
+    'follows': 5000,
+    'seed': 0,
+}
+
+QUERY_STRINGS = {
+    'posts:search': '?q=кофе+идея',
+}
+
+BUDGETS = {
+    'posts:index': 4,
+    'posts:group_list': 5,
+    'posts:profile': 6,
+    'posts:post_detail': 5,
+    'posts:post_comments': 3,
+    'posts:post_create': 3,
+    'posts:post_edit': 5,
+    'posts:add_comment': 3,
+    'posts:follow_index': 5,
+    'posts:search': 6,
+    'posts:profile_follow': 10,
+    'posts:profile_unfollow': 7,
+    'users:logout': 4,
+    'users:signup': 2,
+    'users:login': 2,
+    'users:password_change': 2,
+    'users:password_change_done': 2,
+    'users:password_reset': 2,
+    'users:password_reset_done': 2,
+    'users:password_reset_confirm': 4,
+    'users:password_reset_complete': 2,
+    'about:author': 2,
+    'about:tech': 2,
+    'api:posts': 2,
+    'api:post_detail': 3,
+    'api:group_posts': 4,
+    'api:profile_posts': 4,
+    'api:follow_posts': 6,
+}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+@tag('performance')
+class RouteBudgetTest(TestCase):
+    """Бюджет запросов и время ответа для всех маршрутов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Seeder(**DATASET).run()
+        post = Post.objects.order_by('author_id').first()
+        cls.user = post.author
+        cls.post = post
+        cls.group = Group.objects.first()
+        cls.other = User.objects.exclude(pk=cls.user.pk).first()
+        cls.kwargs = {
+            'slug': cls.group.slug,
+            'username': cls.other.username,
+            'post_id': cls.post.pk,
+            'uidb64': urlsafe_base64_encode(force_bytes(cls.user.pk)),
+            'token': default_token_generator.make_token(cls.user),
+        }
+        cls.report = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        with open(REPORT_PATH, 'w', encoding='utf-8') as report:
+            json.dump(cls.report, report, indent=2, sort_keys=True)
+        super().tearDownClass()
+
+    def routes(self):
+        for module in (posts_urls, users_urls, about_urls, api_urls):
+            for pattern in module.urlpatterns:
+                name = f'{module.app_name}:{pattern.name}'
+                kwargs = {
+                    key: self.kwargs[key]
+                    for key in pattern.pattern.converters
+                }
+                yield name, (
+                    reverse(name, kwargs=kwargs) + QUERY_STRINGS.get(name, '')
+                )
+
+    def test_routes_within_budget(self):
+        """Каждый маршрут укладывается в бюджет запросов."""
+        client = Client()
+        for name, url in self.routes():
+            with self.subTest(route=name):
+                self.assertIn(name, BUDGETS)
+                timings = []
+                queries = 0
+                for _ in range(ROUNDS):
+                    client.force_login(self.user)
+                    with CaptureQueriesContext(connection) as captured:
+                        started = time.perf_counter()
+                        response = client.get(url)
+                        timings.append(time.perf_counter() - started)
+                    queries = max(queries, len(captured))
+                self.report[name] = {
+                    'url': url,
+                    'status': response.status_code,
+                    'queries': queries,
+                    'budget': BUDGETS[name],
+                    'p50_ms': round(percentile(timings, 0.5) * 1000, 2),
+                    'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+                }
+                self.assertLess(response.status_code, 500)
+                self.assertLessEqual(queries, BUDGETS[name])
@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from core.replicas import (COOKIE_NAME, ReplicaRouter, on_replica,
+                           replica_read, use_replica)
+from django.db import connections
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import (RequestFactory, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+from posts.models import Post, User
+
+REPLICAS = ['replica1', 'replica2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_STICKY_SECONDS=10)
+class ReplicaRouterTest(TestCase):
+    """Чтение лент с реплик и возврат в default после своей записи."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_routing(self):
+        """Внутри use_replica чтение уходит на реплику, запись — нет."""
+        self.assertIsNone(self.router.db_for_read(Post))
+        with use_replica():
+            self.assertIn(self.router.db_for_read(Post), REPLICAS)
+            self.assertIsNone(self.router.db_for_read(Session))
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+    def view_state(self, cookies):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies)
+        view = replica_read(
+            lambda request: HttpResponse(str(on_replica()))
+        )
+        return view(request).content.decode()
+
+    def test_sticky_after_write(self):
+        """После записи браузер читает из default, пока живёт куки."""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'},
+        )
+        cookie = response.cookies[COOKIE_NAME]
+        self.assertEqual(cookie['max-age'], 10)
+        self.assertEqual(self.view_state({COOKIE_NAME: '1'}), 'False')
+        self.assertEqual(self.view_state({}), 'True')
+
+    def test_reads_do_not_stick(self):
+        """Просмотр страниц не включает чтение из default."""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('about:author'))
+        self.assertNotIn(COOKIE_NAME, response.cookies)
+
+
+class SyncReplicasTest(TransactionTestCase):
+    """sync_replicas копирует базу в файл, и лента читается из него."""
+
+    alias = 'replica_sync'
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        connections.databases[self.alias] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(directory, 'replica.sqlite3'),
+        }
+        self.addCleanup(self.drop_alias)
+        cache.clear()
+
+    def drop_alias(self):
+        connections[self.alias].close()
+        del connections[self.alias]
+        del connections.databases[self.alias]
+
+    def test_feed_read_from_synced_replica(self):
+        """Пост, записанный после синхронизации, на реплике не виден."""
+        user = User.objects.create_user(username='author')
+        Post.objects.create(author=user, text='Скопированный пост')
+        with self.settings(DATABASE_REPLICAS=[self.alias]):
+            call_command('sync_replicas', stdout=StringIO())
+            Post.objects.create(author=user, text='Новый пост')
+            cache.clear()
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Скопированный пост'],
+        )
+        self.assertEqual(
+            Post.objects.using(self.alias).get().text, 'Скопированный пост'
+        )
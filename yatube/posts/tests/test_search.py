@@ -0,0 +1,167 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from posts import fulltext
+from posts.models import Comment, Post, SearchPosting, User
+from posts.stemmer import stem
+
+
+class StemmerTest(TestCase):
+    """Стеммер сводит словоформы к одной основе."""
+
+    def test_word_forms(self):
+        """Падежи, числа и формы глагола дают одну основу."""
+        groups = (
+            ('книга', 'книги', 'книгами'),
+            ('поездка', 'поездки', 'поездкой'),
+            ('работать', 'работаешь', 'работает'),
+            ('красивый', 'красивая', 'красивейший'),
+        )
+        for forms in groups:
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stem(word) for word in forms}), 1)
+
+    def test_analyze(self):
+        """Регистр, ё и стоп-слова не попадают в индекс."""
+        self.assertEqual(
+            fulltext.analyze('Ёлки и ЁЛКАМИ на Python'),
+            ['елк', 'елк', 'python'],
+        )
+
+
+class SearchIndexTest(TestCase):
+    """Индекс обновляется сигналами и находит посты по всем словам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Читаю книги про город'
+        )
+
+    def found(self, query):
+        return [post.pk for post in fulltext.search(query)]
+
+    def test_post_and_comment_indexed(self):
+        """Пост находится по словам текста и комментариев."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Отличная поездка'
+        )
+        self.assertEqual(self.found('книгами'), [self.post.pk])
+        self.assertEqual(self.found('город поездки'), [self.post.pk])
+        self.assertEqual(self.found('книга кофе'), [])
+        comment.delete()
+        self.assertEqual(self.found('поездки'), [])
+        self.assertFalse(
+            SearchPosting.objects.filter(term=stem('поездка')).exists()
+        )
+
+    def test_edit_updates_weights(self):
+        """Правка текста переносит в индекс только разницу."""
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Город большой'
+        )
+        self.post.text = 'Смотрю фильмы'
+        self.post.save()
+        weights = dict(SearchPosting.objects.filter(
+            post=self.post
+        ).values_list('term', 'weight'))
+        self.assertEqual(weights, {
+            stem('смотрю'): 1, stem('фильмы'): 1,
+            stem('город'): 1, stem('большой'): 1,
+        })
+        self.assertEqual(self.found('книги'), [])
+
+    def test_rebuild_matches_incremental(self):
+        """Полная пересборка даёт тот же индекс, что и сигналы."""
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Город, город!'
+        )
+        rows = set(SearchPosting.objects.values_list(
+            'term', 'post_id', 'weight'
+        ))
+        fulltext.rebuild()
+        self.assertEqual(rows, set(SearchPosting.objects.values_list(
+            'term', 'post_id', 'weight'
+        )))
+
+    def test_newest_first(self):
+        """Результаты идут от новых постов к старым."""
+        newer = Post.objects.create(author=self.user, text='Новый город')
+        self.assertEqual(self.found('город'), [newer.pk, self.post.pk])
+
+    @override_settings(CURSOR_PAGINATION=True, NUM_REC=1)
+    def test_view_keeps_query(self):
+        """Страница поиска выводит посты и сохраняет q в пагинации."""
+        Post.objects.create(author=self.user, text='Ещё город')
+        response = self.client.get(reverse('posts:search'), {'q': 'город'})
+        self.assertEqual(len(response.context['page_obj']), 1)
+        self.assertContains(response, '?q=%D0%B3%D0%BE%D1%80%D0%BE%D0%B4&amp;')
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт по индексу, а не по LIKE."""
+        other = Post.objects.create(author=self.user, text='Про кино')
+        request = RequestFactory().get('/')
+        queryset, distinct = site._registry[Post].get_search_results(
+            request, Post.objects.all(), 'книгами'
+        )
+        self.assertEqual(list(queryset), [self.post])
+        self.assertNotIn(other, queryset)
+        self.assertFalse(distinct)
+
+
+class ReindexCommandTest(TestCase):
+    """reindex_posts идёт пачками по pk и продолжает с checkpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(author=user, text=f'Город номер {number}')
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=user, text='Кофе'
+        )
+
+    def setUp(self):
+        self.expected = set(SearchPosting.objects.values_list(
+            'term', 'post_id', 'weight'
+        ))
+        SearchPosting.objects.all().delete()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        self.checkpoint = os.path.join(directory, 'checkpoint')
+
+    def reindex(self, **options):
+        out = StringIO()
+        call_command(
+            'reindex_posts', chunk_size=2, checkpoint=self.checkpoint,
+            stdout=out, **options
+        )
+        return out.getvalue()
+
+    def test_full_rebuild(self):
+        """Пересборка в пуле процессов совпадает с индексом сигналов."""
+        out = self.reindex(workers=2)
+        self.assertEqual(self.expected, set(SearchPosting.objects.values_list(
+            'term', 'post_id', 'weight'
+        )))
+        self.assertIn('постов/с', out)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resume(self):
+        """С --resume обрабатываются только посты после checkpoint."""
+        with open(self.checkpoint, 'w') as checkpoint:
+            checkpoint.write(str(self.posts[2].pk))
+        out = self.reindex(workers=1, resume=True)
+        self.assertIn('постов 2,', out)
+        self.assertEqual(
+            set(SearchPosting.objects.values_list('post_id', flat=True)),
+            {post.pk for post in self.posts[3:]},
+        )
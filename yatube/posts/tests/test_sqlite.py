@@ -0,0 +1,21 @@
+from core.signals import apply_sqlite_pragmas
+from django.db import connection
+from django.test import TestCase
+
+
+class SqlitePragmasTest(TestCase):
+    """Прагмы профиля выставляются новому соединению."""
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        """connection_created применяет SQLITE_PRAGMAS."""
+        previous = self.pragma('cache_size')
+        with self.settings(SQLITE_PRAGMAS={'cache_size': -1234}):
+            apply_sqlite_pragmas(None, connection=connection)
+            self.assertEqual(self.pragma('cache_size'), -1234)
+        with self.settings(SQLITE_PRAGMAS={'cache_size': previous}):
+            apply_sqlite_pragmas(None, connection=connection)
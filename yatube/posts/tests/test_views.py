@@ -1,14 +1,23 @@
 import shutil
 import tempfile
+from io import StringIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from posts.models import Comment, Follow, Group, Post, User
+from posts import thumbnails
+from sorl.thumbnail import default
+from posts.cache import get_version
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+from posts.utils import encode_cursor
 
 User = get_user_model()
 
@@ -57,6 +66,7 @@ class PostViewTests(TestCase):
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
+        cache.clear()
 
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
@@ -279,6 +289,92 @@ class PostPaginatorTest(TestCase):
         self.assertIn(post, profile)
 
 
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        posts = [
+            Post(
+                text=f'Текст {i}',
+                author=cls.user,
+                group=cls.group,
+            )
+            for i in range(13)
+        ]
+        Post.objects.bulk_create(posts)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def get_page(self, url, cursor=''):
+        response = self.client.get(url, {'cursor': cursor})
+        return response.context['page_obj']
+
+    def test_cursor_pages(self):
+        """Курсорная пагинация отдаёт все посты без повторов."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.get_page(url)
+                self.assertTrue(first.is_cursor)
+                self.assertEqual(len(first), 10)
+                self.assertFalse(first.has_previous())
+                second = self.get_page(url, first.next_cursor)
+                self.assertEqual(len(second), 3)
+                self.assertFalse(second.has_next())
+                self.assertEqual(
+                    len({post.pk for post in [*first, *second]}), 13
+                )
+                previous = self.get_page(url, second.previous_cursor)
+                self.assertEqual(list(previous), list(first))
+
+    def test_cursor_stable_on_insert(self):
+        """Новые посты не сдвигают следующую страницу курсора."""
+        url = reverse('posts:index')
+        first = self.get_page(url)
+        Post.objects.create(text='Новый пост', author=self.user)
+        second = self.get_page(url, first.next_cursor)
+        self.assertEqual(len(second), 3)
+        self.assertNotIn(first[-1], second)
+
+    def test_bad_cursor_returns_first_page(self):
+        """Испорченный курсор ведёт на первую страницу."""
+        page = self.get_page(reverse('posts:index'), 'broken!')
+        self.assertEqual(len(page), 10)
+        self.assertFalse(page.has_previous())
+
+    def test_tampered_cursor_returns_first_page(self):
+        """Курсор с чужими типами или огромным pk ведёт на первую страницу."""
+        for values in (
+            ['not-a-date', 1],
+            [Post.objects.first().pub_date, 'abc'],
+            [Post.objects.first().pub_date, 2 ** 63],
+            [{'a': 1}, 1],
+            [None, 1],
+            [1],
+        ):
+            with self.subTest(values=values):
+                cursor = encode_cursor(values)
+                page = self.get_page(reverse('posts:index'), cursor)
+                self.assertEqual(len(page), 10)
+                self.assertFalse(page.has_previous())
+                response = self.client.get(
+                    reverse('api:posts'), {'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+
+
 class CommentTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -328,6 +424,134 @@ class CommentTest(TestCase):
             ).exists()
         )
 
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_comments_loaded_by_cursor(self):
+        """Комментарии идут порциями от старых к новым через фрагмент"""
+        comments = [
+            Comment.objects.create(
+                post=self.post, author=self.user, text=f'Комментарий {i}'
+            )
+            for i in range(5)
+        ]
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=[self.post.id])
+        )
+        page = response.context['comments']
+        self.assertEqual(list(page), comments[:2])
+        url = reverse('posts:post_comments', args=[self.post.id])
+        seen = list(page)
+        while page.has_next():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.guest_client.get(
+                    url, {'cursor': page.next_cursor}
+                )
+            page = response.context['comments']
+            seen.extend(page)
+            self.assertEqual(len(queries), 1)
+            self.assertNotContains(response, '<html')
+        self.assertEqual(seen, comments)
+        self.assertContains(response, 'Комментарий 4')
+
+    def reply(self, parent, text):
+        return Comment.objects.create(
+            post=self.post, author=self.user, text=text, parent=parent
+        )
+
+    def detail(self, **params):
+        return self.guest_client.get(
+            reverse('posts:post_detail', args=[self.post.id]), params
+        ).context['comments']
+
+    def test_threads_ordered_by_path(self):
+        """Ответы идут сразу за своим комментарием, ветка за веткой"""
+        first = self.reply(None, 'Первый')
+        second = self.reply(None, 'Второй')
+        answer = self.reply(first, 'Ответ')
+        nested = self.reply(answer, 'Ответ на ответ')
+        self.assertEqual(
+            list(self.detail()), [first, answer, nested, second]
+        )
+        self.assertEqual(
+            [comment.depth for comment in self.detail()], [0, 1, 2, 0]
+        )
+
+    @override_settings(COMMENT_MAX_DEPTH=1)
+    def test_depth_limit(self):
+        """Ответ глубже предела становится соседом родителя"""
+        root = self.reply(None, 'Корень')
+        answer = self.reply(root, 'Ответ')
+        nested = self.reply(answer, 'Ещё ответ')
+        self.assertEqual(nested.parent, root)
+        self.assertEqual(nested.depth, 1)
+
+    @override_settings(COMMENTS_COLLAPSE_THRESHOLD=3)
+    def test_collapsed_threads(self):
+        """Большое обсуждение показывает корни, ветка грузится отдельно"""
+        first = self.reply(None, 'Первый')
+        answer = self.reply(first, 'Ответ')
+        nested = self.reply(answer, 'Ответ на ответ')
+        second = self.reply(None, 'Второй')
+        roots = self.detail()
+        self.assertEqual(list(roots), [first, second])
+        self.assertEqual(
+            [comment.reply_count for comment in roots], [2, 0]
+        )
+        response = self.guest_client.get(
+            reverse('posts:post_comments', args=[self.post.id]),
+            {'thread': first.pk},
+        )
+        self.assertEqual(list(response.context['comments']), [answer, nested])
+
+    def test_reply_form(self):
+        """Ответ на комментарий к другому посту становится корневым"""
+        root = self.reply(None, 'Корень')
+        other = Post.objects.create(author=self.user, text='Другой пост')
+        foreign = Comment.objects.create(
+            post=other, author=self.user, text='Чужой'
+        )
+        url = reverse('posts:add_comment', args=[self.post.id])
+        self.authorized_client.post(url, {'text': 'Ответ', 'parent': root.pk})
+        self.authorized_client.post(
+            url, {'text': 'Мимо', 'parent': foreign.pk}
+        )
+        self.assertEqual(
+            self.post.comments.get(text='Ответ').parent, root
+        )
+        self.assertIsNone(self.post.comments.get(text='Мимо').parent)
+
+    def test_bad_comment_ids_ignored(self):
+        """Нецифровые и слишком большие thread, reply и parent игнорируются"""
+        self.reply(self.reply(None, 'Корень'), 'Ответ')
+        urls = (
+            reverse('posts:post_detail', args=[self.post.id]),
+            reverse('posts:post_comments', args=[self.post.id]),
+            reverse('api:post_detail', args=[self.post.id]),
+        )
+        for value in ('²', str(2 ** 63), '-1'):
+            for url in urls:
+                with self.subTest(url=url, value=value):
+                    response = self.guest_client.get(
+                        url, {'thread': value, 'reply': value}
+                    )
+                    self.assertEqual(response.status_code, 200)
+            with self.subTest(parent=value):
+                self.authorized_client.post(
+                    reverse('posts:add_comment', args=[self.post.id]),
+                    {'text': f'Ответ {value}', 'parent': value},
+                )
+                self.assertIsNone(
+                    self.post.comments.get(text=f'Ответ {value}').parent
+                )
+
+    def test_comments_of_missing_post(self):
+        """Порция комментариев несуществующего поста — 404"""
+        missing = reverse('posts:post_comments', args=[self.post.id + 100])
+        self.assertEqual(self.guest_client.get(missing).status_code, 404)
+        response = self.guest_client.get(
+            reverse('posts:post_comments', args=[self.post.id])
+        )
+        self.assertEqual(response.status_code, 200)
+
 
 class CacheViewsTest(TestCase):
     @classmethod
@@ -350,14 +574,62 @@ class CacheViewsTest(TestCase):
         self.authorized_client.force_login(self.user)
 
     def test_cache_index(self):
+        """Главная страница отдаётся из кэша, пока не сброшена версия."""
         response_1 = self.authorized_client.get(reverse('posts:index')).content
-        self.post.delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
         response_2 = self.authorized_client.get(reverse('posts:index')).content
         self.assertEqual(response_1, response_2)
         cache.clear()
         response_3 = self.authorized_client.get(reverse('posts:index')).content
         self.assertNotEqual(response_2, response_3)
 
+    def test_cache_invalidated_on_delete(self):
+        """Удалённый пост сразу пропадает из закэшированных лент."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+        cached = [self.guest_client.get(url).content for url in urls]
+        self.post.delete()
+        for url, content in zip(urls, cached):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertNotEqual(response.content, content)
+                self.assertNotContains(response, 'Тестовый пост')
+
+    def test_cache_invalidated_on_edit(self):
+        """Перенос поста в другую группу сбрасывает кэш обеих групп."""
+        group2 = Group.objects.create(
+            title='Вторая группа',
+            slug='test-slug2',
+            description='Описание',
+        )
+        self.post.group = self.group
+        self.post.save()
+        old_url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        new_url = reverse('posts:group_list', kwargs={'slug': 'test-slug2'})
+        self.assertContains(self.guest_client.get(old_url), 'Тестовый пост')
+        self.assertNotContains(
+            self.guest_client.get(new_url), 'Тестовый пост'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Тестовый пост', 'group': group2.pk},
+        )
+        self.assertNotContains(
+            self.guest_client.get(old_url), 'Тестовый пост'
+        )
+        self.assertContains(self.guest_client.get(new_url), 'Тестовый пост')
+
+    def test_cache_invalidated_on_comment(self):
+        """Новый комментарий сразу виден на закэшированной странице поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.guest_client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Свежий комментарий'
+        )
+        self.assertContains(self.guest_client.get(url), 'Свежий комментарий')
+
 
 class FollowTests(TestCase):
     @classmethod
@@ -414,3 +686,456 @@ class FollowTests(TestCase):
             reverse("posts:follow_index")
         )
         self.assertNotEqual(post, response.context)
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Старый пост',
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_feed(self):
+        """Подписка переносит старые посты автора в ленту."""
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'author'}
+        ))
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_new_post_fanned_out(self):
+        """Новый пост записывается в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    def test_unfollow_trims_feed(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'author'}
+        ))
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed(), [])
+
+    def test_rebuild_feed_command(self):
+        """Команда rebuild_feed восстанавливает ленту по подпискам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='Новый пост')
+        FeedEntry.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_feed', stdout=out)
+        self.assertEqual(len(self.feed()), 2)
+        self.assertIn('записей добавлено: 2', out.getvalue())
+
+    @override_settings(FEED_CELEBRITY_THRESHOLD=2)
+    def test_rebuild_matches_fan_out(self):
+        """Пересборка повторяет ленты из сигналов без знаменитостей."""
+        star = User.objects.create_user(username='star')
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=star)
+        Follow.objects.create(user=fan, author=star)
+        Post.objects.create(author=star, text='Пост звезды')
+        Post.objects.create(author=self.author, text='Новый пост')
+        fields = ('user_id', 'post_id', 'author_id', 'pub_date')
+        before = set(FeedEntry.objects.values_list(*fields))
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feed', stdout=StringIO())
+        self.assertEqual(set(FeedEntry.objects.values_list(*fields)), before)
+        self.assertFalse(FeedEntry.objects.filter(author=star).exists())
+        self.assertEqual(FeedEntry.objects.count(), 2)
+
+    @override_settings(FEED_CELEBRITY_THRESHOLD=2)
+    def test_unfollow_backfills_former_celebrity(self):
+        """Автор ниже порога раскладывается по лентам оставшихся."""
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=fan, author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(user=fan).exists())
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'author'}
+        ))
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user_id', 'post_id')),
+            [(fan.pk, self.old_post.pk)],
+        )
+
+    @override_settings(FEED_CELEBRITY_THRESHOLD=2, NUM_REC=2)
+    def test_celebrity_posts_merged_on_read(self):
+        """Посты знаменитостей не раскладываются, а подмешиваются в ленту."""
+        star = User.objects.create_user(username='star')
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=star)
+        Follow.objects.create(user=fan, author=star)
+        star_post = Post.objects.create(author=star, text='Пост звезды')
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(FeedEntry.objects.filter(author=star).exists())
+        self.assertEqual(self.feed(), [new_post, star_post])
+        response = self.reader_client.get(
+            reverse('posts:follow_index'), {'page': 2}
+        )
+        self.assertEqual(list(response.context['page_obj']), [self.old_post])
+        response = self.reader_client.get(
+            reverse('posts:follow_index'), {'cursor': ''}
+        )
+        page = response.context['page_obj']
+        response = self.reader_client.get(
+            reverse('posts:follow_index'), {'cursor': page.next_cursor}
+        )
+        self.assertEqual(list(response.context['page_obj']), [self.old_post])
+
+
+class ConditionalGetTest(TestCase):
+    """Страницы лент отвечают 304 по ETag из версий кэша."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test-slug', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_not_modified(self):
+        """Повтор с ETag — 304 без запросов к базе, пока нет изменений."""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('s-maxage', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_pages_checked_before_feed(self):
+        """Группа, профиль и пост проверяют ETag до запроса ленты."""
+        for url in (
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(len(queries), 1)
+
+    def test_per_user_etag(self):
+        """У каждого вошедшего пользователя своя приватная копия."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        anonymous = self.client.get(url)['ETag']
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        etag = response['ETag']
+        self.assertNotEqual(etag, anonymous)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Comment.objects.create(post=self.post, author=self.other, text='Да')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.client.force_login(self.other)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_replica_pages_not_validated(self):
+        """Страница с реплики уходит без ETag и с no-store."""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        for url in (url, reverse('api:posts')):
+            with self.subTest(url=url):
+                with mock.patch(
+                    'core.conditional.on_replica', return_value=True
+                ):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.has_header('ETag'))
+                self.assertFalse(response.has_header('Last-Modified'))
+                self.assertIn('no-store', response['Cache-Control'])
+
+
+class SharedPageTest(TestCase):
+    """Общая страница из кэша, пользовательские части — на каждый запрос."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='first')
+        cls.other = User.objects.create_user(username='second')
+        Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_page_cached(self):
+        """Повторная анонимная главная не обращается к базе."""
+        url = reverse('posts:index')
+        first = self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(first.content, second.content)
+        self.assertNotContains(second, '<!--hole:')
+        self.assertContains(second, 'Войти')
+
+    def test_holes_per_user(self):
+        """Шапка и переключатель лент рисуются для каждого пользователя."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        for user in (self.user, self.other):
+            with self.subTest(user=user.username):
+                self.client.force_login(user)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertContains(
+                    response, f'Пользователь: {user.username}'
+                )
+                self.assertContains(response, 'Избранные авторы')
+                self.assertNotContains(response, '<!--hole:')
+                self.assertFalse(any(
+                    'posts_post' in query['sql'] for query in queries
+                ))
+
+
+class QueryBudgetTest(TestCase):
+    BUDGETS = {
+        'posts:index': 4,
+        'posts:group_list': 5,
+        'posts:profile': 6,
+        'posts:post_detail': 5,
+        'posts:follow_index': 5,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        authors = [
+            User.objects.create_user(
+                username=f'author{i}',
+                first_name='Имя',
+                last_name=f'Фамилия {i}',
+            )
+            for i in range(5)
+        ]
+        for author in authors:
+            Follow.objects.create(user=cls.user, author=author)
+            for i in range(3):
+                post = Post.objects.create(
+                    text=f'Пост {i}',
+                    author=author,
+                    group=cls.group,
+                )
+                Comment.objects.create(post=post, author=author, text='Да')
+        cls.post = post
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_query_budget(self):
+        """Число запросов на страницах лент не зависит от числа постов."""
+        urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ),
+            'posts:profile': reverse(
+                'posts:profile', kwargs={'username': 'author0'}
+            ),
+            'posts:post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk}
+            ),
+            'posts:follow_index': reverse('posts:follow_index'),
+        }
+        for name, url in urls.items():
+            for params in ({}, {'cursor': ''}):
+                with self.subTest(url=url, params=params):
+                    with CaptureQueriesContext(connection) as queries:
+                        self.authorized_client.get(url, params)
+                    self.assertLessEqual(len(queries), self.BUDGETS[name])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=cls.user,
+            image=SimpleUploadedFile(
+                name='thumb.gif', content=small_gif, content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_create_enqueues_thumbnails(self):
+        """Новый пост с картинкой ставит генерацию миниатюр в очередь."""
+        with mock.patch('posts.views.thumbnails.enqueue') as enqueue:
+            self.authorized_client.post(reverse('posts:post_create'), data={
+                'text': 'Новый пост',
+                'image': SimpleUploadedFile(
+                    name='new.gif', content=small_gif,
+                    content_type='image/gif',
+                ),
+            })
+        post = Post.objects.get(text='Новый пост')
+        enqueue.assert_called_once_with(post.image.name)
+
+    def test_placeholder_until_thumbnail_ready(self):
+        """Пока миниатюр нет, страница не ждёт их и выводит плейсхолдер."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with mock.patch(
+            'posts.thumbnails.enqueue'
+        ) as enqueue, mock.patch(
+            'posts.thumbnails.get_thumbnail'
+        ) as get_thumbnail:
+            response = self.authorized_client.get(url)
+        self.assertContains(response, 'aspect-ratio: 960 / 339')
+        self.assertNotContains(response, '<img class="card-img')
+        get_thumbnail.assert_not_called()
+        enqueue.assert_called_once()
+        self.assertEqual(len(enqueue.call_args[0][1]), 6)
+
+    def test_no_picture_without_image(self):
+        """У поста без картинки нет ни миниатюры, ни плейсхолдера."""
+        post = Post.objects.create(text='Без картинки', author=self.user)
+        Post.objects.filter(pk=self.post.pk).delete()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Без картинки')
+                self.assertNotContains(response, 'card-img')
+
+    def test_picture_srcset(self):
+        """Готовые варианты выводятся в srcset: WebP и запасной JPEG."""
+        def lookup(file_, geometry, **options):
+            extension = options['format'].lower()
+            return mock.Mock(url=f'/media/cache/{geometry}.{extension}')
+
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with mock.patch('posts.thumbnails.lookup', side_effect=lookup):
+            response = self.authorized_client.get(url)
+        self.assertContains(
+            response,
+            '<source type="image/webp" srcset="/media/cache/320x113.webp '
+            '320w, /media/cache/640x226.webp 640w, '
+            '/media/cache/960x339.webp 960w"',
+        )
+        self.assertContains(response, 'src="/media/cache/960x339.jpeg"')
+        self.assertContains(response, '/media/cache/320x113.jpeg 320w')
+
+    def test_generate_invalidates_pages(self):
+        """После генерации миниатюр кэш страниц поста сбрасывается."""
+        before = get_version(('post', self.post.pk))
+        sizes = [('960x339', {'crop': 'center'})]
+        with mock.patch('posts.thumbnails.get_thumbnail') as get_thumbnail:
+            thumbnails.generate(self.post.image.name, sizes)
+        get_thumbnail.assert_called_once_with(
+            self.post.image.name, '960x339', crop='center'
+        )
+        self.assertNotEqual(get_version(('post', self.post.pk)), before)
+
+    def generate_failing(self, sizes):
+        with mock.patch(
+            'posts.thumbnails.get_thumbnail', side_effect=OSError
+        ), self.assertLogs('posts.thumbnails', 'ERROR'):
+            thumbnails.generate(self.post.image.name, sizes)
+
+    def queued_by_picture(self):
+        with mock.patch('posts.thumbnails.enqueue') as enqueue:
+            thumbnails.picture(self.post.image)
+        return enqueue.call_args[0][1]
+
+    def test_failed_thumbnail_not_retried(self):
+        """Неудачная генерация не сбрасывает кэш и не ставится заново."""
+        self.addCleanup(thumbnails._failed.clear)
+        before = get_version(('post', self.post.pk))
+        sizes = thumbnails.get_sizes()
+        self.generate_failing(sizes[:1])
+        self.assertEqual(get_version(('post', self.post.pk)), before)
+        self.assertEqual(self.queued_by_picture(), sizes[1:])
+
+    def test_failures_forgotten(self):
+        """Неудача забывается при новой загрузке и по истечении срока."""
+        self.addCleanup(thumbnails._failed.clear)
+        sizes = thumbnails.get_sizes()
+        self.generate_failing(sizes)
+        thumbnails.enqueue(self.post.image.name)
+        self.assertEqual(self.queued_by_picture(), sizes)
+        with mock.patch.object(
+            thumbnails, '_failed', thumbnails.LRU(len(sizes), 0)
+        ):
+            self.generate_failing(sizes)
+            self.assertEqual(self.queued_by_picture(), sizes)
+
+    def test_thumbnails_prefetched_in_one_query(self):
+        """Метаданные миниатюр страницы читаются одним запросом к БД."""
+        for i in range(5):
+            Post.objects.create(
+                text=f'Картинка {i}',
+                author=self.user,
+                image=SimpleUploadedFile(
+                    name=f'thumb{i}.gif', content=small_gif,
+                    content_type='image/gif',
+                ),
+            )
+        default.kvstore.lru.clear()
+        with mock.patch('posts.thumbnails.enqueue'):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.authorized_client.get(reverse('posts:index'))
+        kvstore_queries = [
+            query for query in queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        self.assertContains(response, 'aspect-ratio: 960 / 339', count=6)
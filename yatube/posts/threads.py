@@ -0,0 +1,82 @@
+import re
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.db.models.functions import Substr
+from django.http import QueryDict
+
+from .models import COMMENT_PATH_WIDTH, Comment, comment_path
+from .utils import CursorPaginator
+
+COMMENT_ORDERING = ('path',)
+# Только ASCII-цифры: isdigit() пропускает '²', а int() на нём падает.
+# 18 цифр заведомо меньше 2**63 — предела целого в базе.
+COMMENT_ID_RE = re.compile(r'[0-9]{1,18}')
+
+
+def parse_comment_id(value):
+    """pk комментария из параметра запроса или None для мусора."""
+    if COMMENT_ID_RE.fullmatch(value or ''):
+        return int(value)
+    return None
+
+
+def subtree(path):
+    """Потомки комментария с путём path: диапазон по индексу (post, path).
+
+    Пути состоят из цифр, поэтому все продолжения префикса лежат
+    строго между path и path + ':' (следующий за '9' символ).
+    """
+    return Q(path__gt=path, path__lt=path + ':')
+
+
+def thread(comment_id):
+    """Ответы на корневой комментарий: путь корня известен по pk."""
+    return subtree(comment_path('', comment_id))
+
+
+def count_replies(post_id, roots):
+    """Проставляет корням страницы reply_count одним запросом."""
+    if not roots:
+        return
+    replies = Comment.objects.filter(
+        post_id=post_id,
+        path__gt=roots[0].path,
+        path__lt=roots[-1].path + ':',
+        depth__gt=0,
+    ).annotate(
+        root=Substr('path', 1, COMMENT_PATH_WIDTH)
+    ).order_by().values('root').annotate(total=Count('pk'))
+    counts = {row['root']: row['total'] for row in replies}
+    for root in roots:
+        root.reply_count = counts.get(root.path, 0)
+
+
+def get_comments_page(post_id, request, collapsed=False):
+    """Порция комментариев в порядке веток после ?cursor=.
+
+    ?thread=<id> — ответы на корневой комментарий, в свёрнутом виде
+    (?collapsed=1) — только корни с числом ответов в ветке.
+    Возвращает страницу и строку параметров для ссылки «ещё».
+    """
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only(
+        'post', 'parent', 'text', 'pub_date', 'path', 'depth',
+        'author__username',
+    )
+    query = QueryDict(mutable=True)
+    root = parse_comment_id(request.GET.get('thread'))
+    if root is not None:
+        comments = comments.filter(thread(root))
+        query['thread'] = str(root)
+    elif collapsed or 'collapsed' in request.GET:
+        comments = comments.filter(depth=0)
+        query['collapsed'] = 1
+    paginator = CursorPaginator(
+        comments, settings.COMMENTS_PER_PAGE, ordering=COMMENT_ORDERING
+    )
+    page = paginator.get_page(request.GET.get('cursor'))
+    if 'collapsed' in query:
+        count_replies(post_id, page)
+    return page, query.urlencode() + '&' if query else ''
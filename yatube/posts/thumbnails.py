@@ -0,0 +1,189 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings as s
+from django.db import connection, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.helpers import serialize
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+
+from .cache import bump, post_scopes
+from .kvstore import LRU
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+# Варианты, которые не удалось создать: повторять их на каждый показ
+# страницы бессмысленно. Память ограничена, а через
+# THUMBNAIL_FAILURE_TIMEOUT вариант пробуется снова.
+_failed = LRU(s.THUMBNAIL_FAILURES_SIZE, s.THUMBNAIL_FAILURE_TIMEOUT)
+_lock = threading.Lock()
+
+
+def _options(source, options):
+    """Дополняет опции так же, как sorl перед вычислением имени файла."""
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+MIME_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg', 'PNG': 'image/png'}
+
+
+def variants():
+    """Ширина, формат, геометрия и опции всех вариантов картинки поста."""
+    width, height = s.POST_IMAGE_SIZE
+    return [
+        (
+            size,
+            image_format,
+            f'{size}x{round(size * height / width)}',
+            {'crop': 'center', 'upscale': True, 'format': image_format},
+        )
+        for image_format in s.POST_IMAGE_FORMATS
+        for size in s.POST_IMAGE_WIDTHS
+    ]
+
+
+def get_sizes():
+    return [(geometry, options) for _, _, geometry, options in variants()]
+
+
+def thumbnail_file(file_, geometry, options):
+    """Файл миниатюры, который создал бы sorl: без чтения исходника."""
+    source = ImageFile(file_)
+    name = default.backend._get_thumbnail_filename(
+        source, geometry, _options(source, options)
+    )
+    return ImageFile(name, default.storage)
+
+
+def lookup(file_, geometry, **options):
+    """Готовая миниатюра из kvstore или None; сама ничего не генерирует."""
+    return default.kvstore.get(thumbnail_file(file_, geometry, options))
+
+
+def _key(name, geometry, options):
+    return name, geometry, serialize(options)
+
+
+def picture(file_):
+    """Готовые варианты картинки по форматам: {format: [(width, url)]}.
+
+    Недостающие варианты ставятся в очередь на генерацию, кроме тех,
+    что уже не удалось создать.
+    """
+    ready = {}
+    missing = []
+    for size, image_format, geometry, options in variants():
+        thumbnail = lookup(file_, geometry, **options)
+        if thumbnail is None:
+            if _failed.get(_key(file_.name, geometry, options)) is None:
+                missing.append((geometry, options))
+        else:
+            ready.setdefault(image_format, []).append((size, thumbnail.url))
+    if missing:
+        enqueue(file_.name, missing)
+    return ready
+
+
+def prefetch(posts, sizes=None):
+    """Загружает метаданные миниатюр постов страницы одним чтением."""
+    if not hasattr(default.kvstore, 'prefetch'):
+        return
+    default.kvstore.prefetch([
+        thumbnail_file(post.image, geometry, options)
+        for post in posts if post.image
+        for geometry, options in (sizes or get_sizes())
+    ])
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=s.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def generate(name, sizes):
+    """Создаёт миниатюры и сбрасывает кэш страниц с плейсхолдером.
+
+    Если не получилось ни одного варианта, кэш не сбрасывается.
+    """
+    try:
+        created = False
+        for geometry, options in sizes:
+            try:
+                get_thumbnail(name, geometry, **options)
+            except Exception:
+                logger.exception('Не удалось создать миниатюру %s', name)
+                _failed.set(_key(name, geometry, options), EMPTY_VALUE)
+            else:
+                created = True
+        if created:
+            for post in Post.objects.filter(image=name).only(
+                'pk', 'author', 'group'
+            ):
+                bump(*post_scopes(post))
+    finally:
+        with _lock:
+            _pending.difference_update(
+                _key(name, geometry, options) for geometry, options in sizes
+            )
+
+
+def _work(name, sizes):
+    try:
+        generate(name, sizes)
+    finally:
+        connection.close()
+
+
+def _submit(name, sizes):
+    with _lock:
+        sizes = [
+            (geometry, options) for geometry, options in sizes
+            if _key(name, geometry, options) not in _pending
+            and _failed.get(_key(name, geometry, options)) is None
+        ]
+        _pending.update(
+            _key(name, geometry, options) for geometry, options in sizes
+        )
+    if sizes:
+        _get_executor().submit(_work, name, sizes)
+
+
+def enqueue(name, sizes=None):
+    """Ставит генерацию миниатюр в очередь фонового пула.
+
+    Задача уходит в пул после коммита транзакции, когда файл и запись
+    поста уже видны другим соединениям. Повторные запросы той же
+    миниатюры, пока она в очереди или после неудачи, игнорируются.
+    Вызов без sizes — новая загрузка: прошлые неудачи файла забываются.
+    """
+    if name:
+        if sizes is None:
+            _failed.delete(*(
+                _key(name, geometry, options)
+                for geometry, options in get_sizes()
+            ))
+        sizes = list(sizes or get_sizes())
+        transaction.on_commit(lambda: _submit(name, sizes))
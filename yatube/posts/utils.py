@@ -1,8 +1,171 @@
+import base64
+import binascii
+import collections.abc
+import datetime
+import json
+
 from django.conf import settings as s
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_ORDERING = ('-pub_date', '-pk')
+# Целые вне 64 бит база не примет: фильтр по ним падает с OverflowError.
+CURSOR_INT_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+def encode_cursor(values, reverse=False):
+    """Упаковывает значения ключа сортировки в непрозрачный токен."""
+    values = [
+        value.isoformat() if isinstance(value, datetime.datetime) else value
+        for value in values
+    ]
+    raw = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (values, reverse) или None для пустого/битого токена."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw.decode())
+        return list(data['v']), bool(data['r'])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        return None
+
+
+class CursorPaginator:
+    """Пагинация по ключу (pub_date, id): без COUNT(*) и OFFSET."""
+
+    def __init__(self, object_list, per_page, ordering=CURSOR_ORDERING):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+
+    @cached_property
+    def count(self):
+        return self.object_list.count()
+
+    def _fields(self):
+        return [
+            (field.lstrip('-'), field.startswith('-'))
+            for field in self.ordering
+        ]
+
+    def _values(self, obj):
+        return [getattr(obj, name) for name, _ in self._fields()]
+
+    def _keyset(self, values, reverse):
+        keyset = Q()
+        equal = Q()
+        for (name, descending), value in zip(self._fields(), values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            keyset |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return keyset
+
+    def _parse(self, values):
+        """Значения курсора в типах полей сортировки или None."""
+        if len(values) != len(self.ordering):
+            return None
+        meta = self.object_list.model._meta
+        parsed = []
+        for (name, _), value in zip(self._fields(), values):
+            field = meta.pk if name == 'pk' else meta.get_field(name)
+            try:
+                value = field.to_python(value)
+            except (ValidationError, ValueError, TypeError):
+                return None
+            if value is None:
+                return None
+            if isinstance(value, int) and value not in CURSOR_INT_RANGE:
+                return None
+            parsed.append(value)
+        return parsed
+
+    def get_page(self, cursor=None):
+        decoded = decode_cursor(cursor)
+        if decoded is not None:
+            values = self._parse(decoded[0])
+            decoded = None if values is None else (values, decoded[1])
+        values, reverse = decoded or (None, False)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                name if descending else f'-{name}'
+                for name, descending in self._fields()
+            )
+        queryset = self.object_list.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._keyset(values, reverse))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            if not rows:
+                return self.get_page()
+            rows.reverse()
+            return CursorPage(rows, self, has_next=True, has_previous=has_more)
+        return CursorPage(
+            rows, self, has_next=has_more, has_previous=values is not None
+        )
+
+
+class CursorPage(collections.abc.Sequence):
+    """Страница курсорной пагинации с интерфейсом, близким к Page."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        if not isinstance(index, (int, slice)):
+            raise TypeError
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(self.paginator._values(self.object_list[-1]))
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        if not self.object_list:
+            return ''
+        return encode_cursor(
+            self.paginator._values(self.object_list[0]), reverse=True
+        )
 
 
-def get_page_context(queryset, request):
+def get_page_context(queryset, request, cursor=False):
+    if cursor and (s.CURSOR_PAGINATION or 'cursor' in request.GET):
+        paginator = CursorPaginator(queryset, s.NUM_REC)
+        return paginator.get_page(request.GET.get('cursor'))
     paginator = Paginator(queryset, s.NUM_REC)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -1,57 +1,139 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, QueryDict
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.cache.page import shared_page
+from core.conditional import not_modified, page_cache_policy
+from core.replicas import replica_read
+
+from . import fulltext, thumbnails
+from .cache import INDEX, get_version
+from .feed import get_feed
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
+from .models import Follow, Group, Post, User
+from .threads import get_comments_page, parse_comment_id
 from .utils import get_page_context
 
 
+@page_cache_policy
+@replica_read
 def index(request):
-    posts = Post.objects.select_related('group')
-    page_obj = get_page_context(posts, request)
-    context = {'page_obj': page_obj, }
-    return render(request, 'posts/index.html', context)
-
-
+    cache_version = get_version(INDEX)
+    response = not_modified(request, cache_version)
+    if response is not None:
+        return response
+    return shared_page(request, cache_version, 'posts/index.html', lambda: {
+        'page_obj': get_page_context(
+            Post.objects.for_feed(), request, cursor=True
+        ),
+        'cache_version': cache_version,
+    })
+
+
+@page_cache_policy
+@replica_read
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('group')
-    page_obj = get_page_context(group.posts.all(), request)
-    context = {
-        'group': group,
-        'posts': posts,
-        'page_obj': page_obj,
-    }
-    return render(request, 'posts/group_list.html', context)
+    cache_version = get_version(('group', group.pk))
+    response = not_modified(request, cache_version)
+    if response is not None:
+        return response
+    posts = group.posts.for_feed()
+    return shared_page(
+        request, cache_version, 'posts/group_list.html', lambda: {
+            'group': group,
+            'posts': posts,
+            'page_obj': get_page_context(posts, request, cursor=True),
+            'cache_version': cache_version,
+        }
+    )
 
 
+@page_cache_policy
+@replica_read
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author__username=username)
-    following = Follow.objects.filter(user__username=request.user,
-                                      author=author)
-    page_obj = get_page_context(author.posts.all(), request)
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username
+    )
+    cache_version = get_version(('author', author.pk))
+    response = not_modified(request, cache_version)
+    if response is not None:
+        return response
+    posts = author.posts.for_feed()
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user,
+        author=author,
+    ).exists()
+    page_obj = get_page_context(posts, request, cursor=True)
     context = {
         'author': author,
         'posts': posts,
         'following': following,
         'page_obj': page_obj,
+        'cache_version': cache_version,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@page_cache_policy
+@replica_read
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = Comment.objects.filter(post__id=post.id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__counters', 'group'),
+        id=post_id,
+    )
+    cache_version = get_version(('post', post.pk), ('author', post.author_id))
+    response = not_modified(request, cache_version)
+    if response is not None:
+        return response
+    comments, comments_query = get_comments_page(
+        post.pk, request,
+        collapsed=post.comments_count >= settings.COMMENTS_COLLAPSE_THRESHOLD,
+    )
+    reply = parse_comment_id(request.GET.get('reply'))
     form = CommentForm()
     context = {
         'post': post,
+        'reply': reply or '',
         'comments': comments,
+        'comments_query': comments_query,
         'form': form,
+        'cache_version': cache_version,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@replica_read
+def post_comments(request, post_id):
+    comments, comments_query = get_comments_page(post_id, request)
+    # Непустая порция уже доказывает, что пост есть: лишний запрос
+    # нужен только для пустой.
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+        'comments_query': comments_query,
+        'cache_version': get_version(('post', post_id)),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+@replica_read
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = get_page_context(fulltext.search(query), request, cursor=True)
+    page_query = QueryDict(mutable=True)
+    page_query['q'] = query
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': page_query.urlencode() + '&' if query else '',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -59,6 +141,7 @@ def post_create(request):
         create_post = form.save(commit=False)
         create_post.author = request.user
         create_post.save()
+        thumbnails.enqueue(create_post.image.name)
         return redirect('posts:profile', create_post.author)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -75,6 +158,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.enqueue(post.image.name)
         return redirect('posts:post_detail', post_id=post.pk)
     context = {'form': form, 'is_edit': True, 'post': post}
     return render(request, 'posts/create_post.html', context)
@@ -88,14 +173,18 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        parent = parse_comment_id(request.POST.get('parent'))
+        if parent is not None:
+            comment.parent = post.comments.filter(pk=parent).first()
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@replica_read
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page_context(posts, request)
+    posts = get_feed(request.user)
+    page_obj = get_page_context(posts, request, cursor=True)
     context = {'page_obj': page_obj, }
     return render(request, 'posts/follow.html', context)
 
@@ -15,6 +15,30 @@ ALLOWED_HOSTS = [
 
 NUM_REC = 10
 
+CURSOR_PAGINATION = False
+
+# Комментарии на странице поста и в каждой подгружаемой порции.
+COMMENTS_PER_PAGE = 20
+
+# Ветки комментариев: предельная глубина ответов и число комментариев,
+# начиная с которого страница поста показывает ветки свёрнутыми.
+COMMENT_MAX_DEPTH = 6
+COMMENTS_COLLAPSE_THRESHOLD = 200
+
+# Сколько секунд обратный прокси может отдавать анонимную страницу
+# ленты без перепроверки.
+PAGE_PROXY_MAX_AGE = 30
+
+FEED_BATCH_SIZE = 1000
+
+FEED_CELEBRITY_THRESHOLD = 1000
+
+# Поиск: размер пачки при переиндексации и предел подсчёта вхождений
+# при выборе самого редкого слова запроса.
+SEARCH_BATCH_SIZE = 1000
+SEARCH_COUNT_LIMIT = 10000
+SEARCH_CHECKPOINT = os.path.join(BASE_DIR, 'reindex_posts.checkpoint')
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -26,15 +50,18 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.replicas.StickyPrimaryMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -54,6 +81,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.cache.cache_timeout',
             ],
         },
     },
@@ -62,13 +90,53 @@ TEMPLATES = [
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
+# Профиль SQLite: YATUBE_SQLITE_PROFILE=production включает WAL
+# (читатели не ждут писателя), постоянные соединения и прагмы,
+# которые выставляются каждому новому соединению (core.signals).
+SQLITE_PROFILES = {
+    'default': ({}, 0),
+    'production': (
+        {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -64000,
+            'mmap_size': 256 * 1024 * 1024,
+            'busy_timeout': 5000,
+            'temp_store': 'MEMORY',
+        },
+        600,
+    ),
+}
+SQLITE_PRAGMAS, CONN_MAX_AGE = SQLITE_PROFILES[
+    os.environ.get('YATUBE_SQLITE_PROFILE', 'default')
+]
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
     }
 }
 
+# Реплики для чтения лент: YATUBE_REPLICAS=/path/a.sqlite3,/path/b.sqlite3.
+# Локально файлы держит в синхронизации manage.py sync_replicas.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.environ.get('YATUBE_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# Сколько секунд после записи браузер читает из default: больше
+# задержки репликации. Фрагменты, собранные по реплике, живут столько же.
+REPLICA_STICKY_SECONDS = 10
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -110,8 +178,49 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки пишутся сразу на диск, размер файла ограничен на лету.
+FILE_UPLOAD_HANDLERS = [
+    'core.uploadhandlers.SizeLimitUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+UPLOAD_MAX_SIZE = 10 * 2 ** 20
+IMAGE_MAX_PIXELS = 40 * 10 ** 6
+IMAGE_MAX_SIDE = 2560
+
+# Кэш общий для всех процессов только в режимах file и redis.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        os.path.join(BASE_DIR, 'cache'),
+    ),
+    'redis': ('core.cache.backends.RedisCache', 'redis://127.0.0.1:6379/0'),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[
+    os.environ.get('YATUBE_CACHE', 'locmem')
+]
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION', CACHE_LOCATION),
     }
 }
+
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+FRAGMENT_CACHE_BETA = 1.0
+FRAGMENT_CACHE_LOCK_TIMEOUT = 30
+FRAGMENT_CACHE_WAIT = 2
+
+# Варианты картинки поста для srcset: создаются фоновым пулом.
+POST_IMAGE_SIZE = (960, 339)
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_FORMATS = ('WEBP', 'JPEG')
+POST_IMAGE_SIZES = '(min-width: 768px) 720px, 100vw'
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+THUMBNAIL_LRU_SIZE = 10000
+THUMBNAIL_LRU_MISS_TIMEOUT = 5
+# Сколько неудачных вариантов помнит процесс и через сколько секунд
+# пробует их снова.
+THUMBNAIL_FAILURES_SIZE = 1000
+THUMBNAIL_FAILURE_TIMEOUT = 3600